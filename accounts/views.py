@@ -26,7 +26,7 @@ from rest_framework.response import Response
 from django.apps import apps
 
 from course.models import Course
-from lesson.models import Lesson, LessonProgress
+from lesson.services.progress import course_completed
 from accounts.models import Certificate
 from accounts.services.certificates import issue_or_resend_certificate
 
@@ -85,7 +85,7 @@ def _extract_score(obj):
 def _is_course_completed_for_user(user, course) -> bool:
     """
     1) Основной источник — таблица CoursesDone (app course).
-    2) Фолбек — все опубликованные уроки завершены (LessonProgress).
+    2) Фолбек — все опубликованные уроки завершены (зведений рядок CourseProgress).
     """
     CD = _get_coursesdone_model()
     if CD is not None:
@@ -94,19 +94,8 @@ def _is_course_completed_for_user(user, course) -> bool:
         if q.exists():
             return True
 
-    # --- fallback через LessonProgress ---
-    lessons_qs = Lesson.objects.filter(
-        status=Lesson.Status.PUBLISHED
-    ).filter(
-        Q(module__course_id=course.id) | Q(module__isnull=True, course_id=course.id)
-    )
-    total = lessons_qs.count()
-    if total == 0:
-        return False
-    done = LessonProgress.objects.filter(
-        user=user, lesson__in=lessons_qs, state=LessonProgress.State.COMPLETED
-    ).count()
-    return done == total
+    # --- fallback через CourseProgress: один рядок замість двох COUNT по урокам ---
+    return course_completed(user, course.id)
 
 
 def _get_completed_courses_for_user(user):
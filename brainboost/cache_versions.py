@@ -0,0 +1,41 @@
+"""
+Лічильники версій у кеші для інвалідації без сканування ключів.
+
+Ключі даних містять поточну версію простору імен (`catalog:v<N>:...`);
+bump_version() просто збільшує N — старі записи стають недосяжними й вимиваються по TTL.
+Працює однаково на LocMemCache і на спільних бекендах (Redis/Memcached): incr атомарний.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _key(namespace: str) -> str:
+    return f'ver:{namespace}'
+
+
+def _seed() -> int:
+    # стартуємо з часу в мс, а не з 1: якщо ключ версії витіснили з кешу,
+    # нова версія не збіжеться зі старою і не «воскресить» застарілі записи
+    return int(time.time() * 1000)
+
+
+def get_version(namespace: str) -> int:
+    key = _key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed(), timeout=None)
+        version = cache.get(key)
+    return int(version or 0)
+
+
+def bump_version(namespace: str) -> int:
+    key = _key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # ключа ще немає — будь-яке нове значення вже «інше»
+        version = _seed()
+        if not cache.add(key, version, timeout=None):
+            return cache.incr(key)
+        return version
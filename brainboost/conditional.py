@@ -0,0 +1,63 @@
+"""
+Conditional GET (ETag / Last-Modified) для детальних view.
+
+View з ConditionalGetMixin реалізує get_validators() — дешевий запит (values/aggregate),
+що повертає «відбиток» стану ресурсу та час останньої зміни. Якщо клієнт прислав
+If-None-Match / If-Modified-Since і вони збігаються — одразу 304, без вибірки
+об'єкта й серіалізації. Інакше виконується звичайний retrieve(), а валідатори
+додаються до відповіді.
+"""
+import hashlib
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def make_etag(parts: Iterable) -> str:
+    """Стискаємо довільні значення (дати, id, лічильники) у короткий weak ETag."""
+    raw = '|'.join('' if p is None else str(p) for p in parts)
+    # weak: тіло — JSON-представлення, nginx може його перестиснути (gzip)
+    return 'W/' + quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest()[:32])
+
+
+def latest(*values: Optional[datetime]) -> Optional[datetime]:
+    present = [v for v in values if v is not None]
+    return max(present) if present else None
+
+
+class ConditionalGetMixin:
+    """
+    GET: спершу get_validators(), потім (за потреби) retrieve().
+    get_validators() повертає Validators або None — тоді поводимось як звичайний GET
+    (напр. об'єкта немає: retrieve() сам віддасть 404).
+    Відповідь залежить від користувача (покупка, вішліст) — тому Vary: Authorization.
+    """
+    conditional_vary = ('Authorization',)
+
+    def get_validators(self, request, *args, **kwargs) -> Optional[Validators]:
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return self.retrieve(request, *args, **kwargs)
+
+        last_modified = validators.last_modified.timestamp() if validators.last_modified else None
+        not_modified = get_conditional_response(
+            request, etag=validators.etag, last_modified=last_modified,
+        )
+        response = not_modified if not_modified is not None else self.retrieve(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = validators.etag
+            if last_modified is not None:
+                response.headers['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, self.conditional_vary)
+        return response
@@ -0,0 +1,35 @@
+"""
+Пер-рядкові post_delete/pre_delete ресивери під час каскадного видалення.
+
+Видалення курсу чи тесту шле сигнал на кожен дочірній рядок, і «перерахунок на рядок»
+перетворюється на N однакових UPDATE/агрегатів в одній транзакції. Django передає в сигнал
+origin — екземпляр або QuerySet, на якому викликали delete(). За ним ресивер:
+  - пропускає роботу, якщо видаляється батьківський об'єкт (дочірні рядки зникають разом з ним);
+  - робить її один раз на ключ (курс, урок, тест) за один виклик delete().
+"""
+from django.db.models import Model, QuerySet
+
+
+def deleted_directly(origin, model) -> bool:
+    """True, якщо delete() викликали саме на model (екземпляр чи QuerySet), а не на її батьку."""
+    if origin is None:
+        return True
+    if isinstance(origin, QuerySet):
+        return issubclass(origin.model, model)
+    return isinstance(origin, Model) and isinstance(origin, model)
+
+
+def first_for_origin(origin, key) -> bool:
+    """Позначає key на origin; True лише для першого виклику з цим key у межах одного delete()."""
+    if origin is None:
+        return True
+    done = origin.__dict__.setdefault('_deletion_refreshed', set())
+    if key in done:
+        return False
+    done.add(key)
+    return True
+
+
+def refresh_on_delete(origin, model, key) -> bool:
+    """Чи робити пер-рядкову роботу для key: рядок видаляють напряму, і key ще не оброблено."""
+    return deleted_directly(origin, model) and first_for_origin(origin, key)
@@ -0,0 +1,131 @@
+"""
+Sparse fieldsets: ?fields=a,b,c / ?omit=x,y для GET-відповідей.
+
+SparseFieldsetMixin (серіалізатор) — прибирає поля з відповіді.
+SparseQuerysetMixin (view) — під ці ж поля обрізає queryset: only() по потрібних
+колонках, select_related/prefetch_related лише для потрібних зв'язків.
+
+Полям без прямого відповідника в моделі (SerializerMethodField, властивості)
+залежності описуються в Meta.sparse_sources = {"поле": ("колонка", "зв'язок", ...)}.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _split(value):
+    return {part.strip() for part in (value or '').split(',') if part.strip()}
+
+
+def requested_fieldset(request):
+    """(fields або None, omit) із query string. Для небезпечних методів — без обмежень."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None, set()
+    params = request.query_params
+    fields = params.get(FIELDS_PARAM)
+    return (_split(fields) if fields else None), _split(params.get(OMIT_PARAM))
+
+
+class SparseFieldsetMixin:
+    """
+    Поважає ?fields= / ?omit= лише на верхньому рівні відповіді (об'єкт або елементи списку);
+    вкладені серіалізатори завжди віддають повний набір полів.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_sparse_root():
+            return fields
+        only, omit = requested_fieldset(self.context.get('request'))
+        if only is not None:
+            fields = {name: field for name, field in fields.items() if name in only}
+        for name in omit:
+            fields.pop(name, None)
+        return fields
+
+    def _is_sparse_root(self):
+        parent = self.parent
+        if parent is None:
+            return True
+        return isinstance(parent, serializers.ListSerializer) and parent.parent is None
+
+
+def _select_related_paths(tree, prefix=''):
+    for name, sub in tree.items():
+        path = f'{prefix}{name}'
+        yield path
+        yield from _select_related_paths(sub, f'{path}__')
+
+
+def _root(path):
+    return path.split('.', 1)[0].split('__', 1)[0]
+
+
+def trim_queryset(queryset, serializer, always=()):
+    """
+    Лишає в queryset лише те, що читають поля serializer (+ always, напр. поля курсора).
+    Якщо джерело хоч одного поля визначити не вдалося — повертає queryset як є:
+    краще зайва колонка, ніж N+1 через відкладені поля.
+    """
+    opts = queryset.model._meta
+    declared = getattr(getattr(serializer, 'Meta', None), 'sparse_sources', {})
+    annotations = queryset.query.annotations
+
+    columns = {opts.pk.name}
+    relations = set()
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in declared:
+            sources = declared[name]
+        elif field.source == '*':
+            return queryset
+        else:
+            sources = (field.source,)
+        for source in sources:
+            head = _root(source)
+            if head in annotations:
+                continue
+            try:
+                model_field = opts.get_field(head)
+            except FieldDoesNotExist:
+                return queryset
+            if model_field.is_relation:
+                relations.add(model_field.name)
+                if model_field.concrete:
+                    columns.add(model_field.name)
+            else:
+                columns.add(model_field.name)
+    columns.update(_root(name.lstrip('-')) for name in always)
+
+    select_related = queryset.query.select_related
+    if select_related is True:
+        # select_related() без аргументів — не знаємо, що саме підтягується
+        return queryset
+    if select_related:
+        paths = [p for p in _select_related_paths(select_related) if _root(p) in relations]
+        queryset = queryset.select_related(None)
+        if paths:   # select_related() без аргументів означав би «усі FK»
+            queryset = queryset.select_related(*paths)
+
+    lookups = [
+        lookup for lookup in queryset._prefetch_related_lookups
+        if _root(lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup) in relations
+    ]
+    queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+    return queryset.only(*columns)
+
+
+class SparseQuerysetMixin:
+    """View: під ?fields= / ?omit= не вибираємо з БД колонки та зв'язки, яких не буде у відповіді."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        only, omit = requested_fieldset(self.request)
+        if only is None and not omit:
+            return queryset
+        return trim_queryset(queryset, self.get_serializer(), always=getattr(self, 'cursor_ordering', None) or ())
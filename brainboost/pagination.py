@@ -0,0 +1,141 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class HybridPagination(PageNumberPagination):
+    """
+    Глобальна пагінація API.
+
+    За замовчуванням — звичайна PageNumberPagination (?page=, PAGE_SIZE із settings).
+
+    Keyset-режим (opt-in) для view з атрибутом `cursor_ordering`, напр. ("-created_at", "id"):
+      ?paginate=cursor            — перша сторінка;
+      ?cursor=<token>             — наступні (посилання next/previous у відповіді).
+    Позиція задається як WHERE (ключ) > (останній рядок) замість OFFSET, тож глибокі
+    сторінки коштують стільки ж, скільки перша. COUNT(*) не виконується,
+    якщо клієнт явно не попросив ?with_total=1.
+    Останнє поле cursor_ordering має бути унікальним (id) і жодне з полів не може бути NULL.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'paginate'
+    total_query_param = 'with_total'
+
+    keyset_ordering = None
+
+    # ---------- mode switch ----------
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'cursor_ordering', None)
+        self.keyset_ordering = None
+        if ordering and self._wants_keyset(request):
+            return self._paginate_keyset(queryset, request, tuple(ordering))
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_ordering is None:
+            return super().get_paginated_response(data)
+        payload = OrderedDict()
+        if self.total is not None:
+            payload['count'] = self.total
+        payload['next'] = self._link(self.next_position, reverse=False)
+        payload['previous'] = self._link(self.previous_position, reverse=True)
+        payload['results'] = data
+        return Response(payload)
+
+    def _wants_keyset(self, request):
+        params = request.query_params
+        return bool(params.get(self.cursor_query_param)) or params.get(self.mode_query_param) == 'cursor'
+
+    # ---------- keyset ----------
+    def _paginate_keyset(self, queryset, request, ordering):
+        self.request = request
+        self.keyset_ordering = ordering
+        self.fields = [queryset.model._meta.get_field(o.lstrip('-')) for o in ordering]
+        self.page_size = self.get_page_size(request)
+
+        position, reverse = self._decode_cursor(request.query_params.get(self.cursor_query_param))
+
+        want_total = request.query_params.get(self.total_query_param) in ('1', 'true', 'yes')
+        self.total = queryset.count() if want_total else None
+
+        order = [self._flip(o) for o in ordering] if reverse else list(ordering)
+        qs = queryset.order_by(*order)
+        if position is not None:
+            qs = qs.filter(self._after(position, order))
+
+        rows = list(qs[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        first = self._position(rows[0]) if rows else None
+        last = self._position(rows[-1]) if rows else None
+        if reverse:
+            # прийшли «назад»: вперед завжди є куди (сторінка, з якої прийшли)
+            self.next_position = last if rows else position
+            self.previous_position = first if has_more else None
+        else:
+            self.next_position = last if has_more else None
+            self.previous_position = first if position is not None and rows else None
+        return rows
+
+    @staticmethod
+    def _flip(order_field):
+        return order_field[1:] if order_field.startswith('-') else f'-{order_field}'
+
+    def _after(self, position, order):
+        """(a, b, c) «після» (x, y, z) з урахуванням напрямків: a>x OR (a=x AND b>y) OR ..."""
+        cond = Q()
+        for i, o in enumerate(order):
+            name = o.lstrip('-')
+            lookup = 'lt' if o.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[i]})
+            for j in range(i):
+                step &= Q(**{self.fields[j].name: position[j]})
+            cond |= step
+        return cond
+
+    def _position(self, obj):
+        return [getattr(obj, f.attname) for f in self.fields]
+
+    # ---------- cursor token ----------
+    def _encode_cursor(self, position, reverse):
+        values = [f.value_to_string(_ValueHolder(f, v)) for f, v in zip(self.fields, position)]
+        raw = json.dumps({'p': values, 'r': int(reverse)}, separators=(',', ':'))
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def _decode_cursor(self, token):
+        if not token:
+            return None, False
+        try:
+            raw = urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+            data = json.loads(raw)
+            values = data['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [f.to_python(v) for f, v in zip(self.fields, values)]
+            return position, bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError, UnicodeDecodeError):
+            raise NotFound('Невірний курсор.')
+
+    def _link(self, position, reverse):
+        if position is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, self._encode_cursor(position, reverse))
+
+
+class _ValueHolder:
+    """Field.value_to_string() читає значення з об'єкта — даємо йому мінімальний об'єкт."""
+
+    def __init__(self, field, value):
+        setattr(self, field.attname, value)
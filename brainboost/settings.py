@@ -100,6 +100,15 @@ DATABASES = {
     }
 }
 
+# Cache: локально — LocMem; у проді можна задати спільний бекенд (Redis/Memcached) через env
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='brainboost'),
+    }
+}
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+
 # Password validators
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -149,7 +158,8 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.OrderingFilter',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # PageNumberPagination + opt-in keyset-режим (?paginate=cursor) для view з cursor_ordering
+    'DEFAULT_PAGINATION_CLASS': 'brainboost.pagination.HybridPagination',
     'PAGE_SIZE': 6,
 }
 
@@ -25,10 +25,11 @@ urlpatterns = [
     #path('admin/', admin.site.urls),
     path('api/admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls')),
+    # публічний каталог — до course.urls, інакше "all/" перехоплює <slug:slug>/
+    path('api/courses/all/', include('courses_list.urls')),
     #path('courses/', include('course.urls')),
     path('api/courses/', include('course.urls')),
     path('api/api-token-auth/', obtain_auth_token, name='api_token_auth'),
-    path('api/courses/all/', include('courses_list.urls')),
     path('api/api/lesson/', include('lesson.urls')),
     path('api/lesson/', include('lesson.urls')),
     path('api/api/ai/', include('ai.urls')),
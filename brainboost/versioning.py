@@ -0,0 +1,27 @@
+"""
+Персистентні версії рядків (Lesson.version, Test.version).
+
+Версія — ключ кешів похідних даних (скомпільований урок, ключ відповідей тесту) і база
+для оптимістичних блокувань. Тому вона лише росте і ніколи не перезаписується
+застарілим значенням з пам'яті.
+"""
+from django.db import models
+
+
+class VersionedModelMixin:
+    """
+    save() існуючого рядка збільшує version у тому ж UPDATE (F('version') + 1),
+    у т.ч. при save(update_fields=[...]). Після збереження атрибут дочитується з БД ліниво.
+    Шляхи без save() (bulk_update, queryset.update, зміни дочірніх рядків) піднімають версію явно.
+    """
+    version_field = 'version'
+
+    def save(self, *args, **kwargs):
+        name = self.version_field
+        if not self._state.adding:
+            setattr(self, name, models.F(name) + 1)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], name}
+        super().save(*args, **kwargs)
+        if isinstance(self.__dict__.get(name), models.expressions.Combinable):
+            del self.__dict__[name]
@@ -4,6 +4,7 @@ from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
 from .models import Chat, Message, ReadMarker
+from brainboost.fieldsets import SparseFieldsetMixin
 from lesson.models import LessonContent  # якщо імпорт інший — підправ
 
 # ---------- Mini: теорія ----------
@@ -41,7 +42,7 @@ class TheoryMiniSerializer(serializers.ModelSerializer):
 
 
 # ---------- Chat ----------
-class ChatSerializer(serializers.ModelSerializer):
+class ChatSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     theory = TheoryMiniSerializer(read_only=True)
     last_message_preview = serializers.SerializerMethodField()
     unread_count = serializers.SerializerMethodField()
@@ -56,6 +57,10 @@ class ChatSerializer(serializers.ModelSerializer):
             "last_message", "last_message_preview",
             "unread_count",
         ]
+        sparse_sources = {
+            "last_message_preview": ("last_message",),
+            "unread_count": (),
+        }
     read_only_fields = [
         "id", "created_at", "updated_at",
         "last_message", "last_message_preview", "unread_count",
@@ -180,7 +185,7 @@ class ChatStartSerializer(serializers.Serializer):
 
 
 # ---------- Message ----------
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     sender = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
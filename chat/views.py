@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .models import Chat, Message, ReadMarker
+from brainboost.fieldsets import SparseQuerysetMixin
 from .serializers import (
     ChatSerializer, ChatStartSerializer,
     MessageSerializer, ReadMarkerSerializer,
@@ -24,7 +25,8 @@ class IsParticipant(permissions.BasePermission):
         return bool(request.user and request.user.is_authenticated)
 
 
-class ChatViewSet(mixins.ListModelMixin,
+class ChatViewSet(SparseQuerysetMixin,
+                  mixins.ListModelMixin,
                   mixins.RetrieveModelMixin,
                   viewsets.GenericViewSet):
     serializer_class = ChatSerializer
@@ -56,11 +58,13 @@ class StartChatView(APIView):
         return Response(out, status=status.HTTP_201_CREATED)
 
 
-class MessageViewSet(mixins.ListModelMixin,
+class MessageViewSet(SparseQuerysetMixin,
+                     mixins.ListModelMixin,
                      mixins.CreateModelMixin,
                      viewsets.GenericViewSet):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated, IsParticipant]
+    cursor_ordering = ("id",)   # ?paginate=cursor — індекс msg_chat_id_idx замість OFFSET
 
     def get_queryset(self):
         u = self.request.user
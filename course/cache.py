@@ -0,0 +1,76 @@
+# course/cache.py
+from __future__ import annotations
+
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from brainboost.cache_versions import bump_version, get_version
+
+CATALOG_NAMESPACE = "catalog"
+
+
+def catalog_version() -> int:
+    return get_version(CATALOG_NAMESPACE)
+
+
+def bump_catalog_version() -> int:
+    """Усі сторінки каталогу стають неактуальними (напряму — лише поза транзакцією запису)."""
+    return bump_version(CATALOG_NAMESPACE)
+
+
+def bump_catalog_version_on_commit() -> None:
+    """
+    Для сигналів Course/Category/Language/Review і перерахунку лічильників: bump після COMMIT.
+    Інакше паралельний запит каталогу між bump і COMMIT прочитав би старі рядки й закешував
+    їх уже під новою версією — до наступної зміни. Поза atomic() виконується одразу.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+def normalized_query_string(request) -> str:
+    """?b=2&a=1&a=0&c= -> a=0&a=1&b=2 (порожні параметри відкидаємо)."""
+    items = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+        if value != ""
+    )
+    return urlencode(items)
+
+
+def catalog_cache_key(request, prefix: str) -> str:
+    # хост/схема впливають на абсолютні next/previous у відповіді
+    base = f"{request.build_absolute_uri(request.path)}?{normalized_query_string(request)}"
+    digest = hashlib.md5(base.encode("utf-8")).hexdigest()
+    return f"{CATALOG_NAMESPACE}:v{catalog_version()}:{prefix}:{digest}"
+
+
+class CatalogCacheMixin:
+    """
+    Кешує відповідь list() для публічних сторінок каталогу.
+    Ключ = версія каталогу + нормалізований query string, тож інвалідація —
+    це лише bump версії, без пошуку/видалення ключів.
+    Зберігаємо вже відрендерений JSON: на влучанні немає ні ORM, ні серіалізації.
+    """
+    catalog_cache_prefix = None
+    catalog_cache_timeout = getattr(settings, "CATALOG_CACHE_TIMEOUT", 300)
+
+    def list(self, request, *args, **kwargs):
+        key = catalog_cache_key(request, self.catalog_cache_prefix or self.__class__.__name__)
+        body = cache.get(key)
+        if body is not None:
+            return HttpResponse(body, content_type="application/json")
+        response = self.uncached_list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, JSONRenderer().render(response.data), self.catalog_cache_timeout)
+        return response
+
+    def uncached_list(self, request, *args, **kwargs):
+        """Відповідь без кешу; в'юхи без ListModelMixin (напр. фасети) перевизначають саме її, а не list()."""
+        return super().list(request, *args, **kwargs)
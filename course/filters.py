@@ -0,0 +1,79 @@
+# course/filters.py
+from __future__ import annotations
+
+import html
+import re
+from typing import Optional
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from .models import COURSE_SEARCH_CONFIG
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# ts_headline не екранує текст, а title/description пише автор курсу. Тому Postgres
+# обгортає збіги керівними символами, а розмітку <mark> ставимо вже після html.escape.
+_HL_START, _HL_STOP = "\x02", "\x03"
+
+
+def build_course_search_query(raw: str) -> Optional[SearchQuery]:
+    """
+    "pyth django" -> to_tsquery('simple', 'pyth:* & django:*').
+    Префіксний збіг зберігає поведінку старого icontains для «недописаних» слів;
+    у raw-запит потрапляють лише \\w-токени, тож синтаксис tsquery зламати не можна.
+    """
+    words = _WORD_RE.findall((raw or "").lower())
+    if not words:
+        return None
+    return SearchQuery(
+        " & ".join(f"{w}:*" for w in words),
+        search_type="raw",
+        config=COURSE_SEARCH_CONFIG,
+    )
+
+
+def render_highlight(headline: Optional[str]) -> Optional[str]:
+    """Результат SearchHeadline -> безпечний HTML: екранований текст, збіги в <mark>...</mark>."""
+    if headline is None:
+        return None
+    return (
+        html.escape(headline, quote=False)
+        .replace(_HL_START, CourseFullTextSearchFilter.highlight_start)
+        .replace(_HL_STOP, CourseFullTextSearchFilter.highlight_stop)
+    )
+
+
+class CourseFullTextSearchFilter(filters.SearchFilter):
+    """
+    ?search= по Course.search_vector (GIN) замість ILIKE '%q%' по кожному полю.
+    Додає search_rank і фрагменти зі збігами (search_headline_*, див. render_highlight);
+    без явного ?ordering= результати йдуть за релевантністю.
+    """
+    highlight_start = "<mark>"
+    highlight_stop = "</mark>"
+
+    def filter_queryset(self, request, queryset, view):
+        query = build_course_search_query(request.query_params.get(self.search_param, ""))
+        if query is None:
+            return queryset
+
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F("search_vector"), query),
+            search_headline_title=SearchHeadline(
+                "title", query, config=COURSE_SEARCH_CONFIG,
+                start_sel=_HL_START, stop_sel=_HL_STOP,
+                highlight_all=True,
+            ),
+            search_headline_description=SearchHeadline(
+                "description", query, config=COURSE_SEARCH_CONFIG,
+                start_sel=_HL_START, stop_sel=_HL_STOP,
+                max_words=35, min_words=15, max_fragments=2,
+            ),
+        )
+
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by("-search_rank", "-created_at", "id")
+        return queryset
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:50
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_lesson_counters(apps, schema_editor):
+    Course = apps.get_model('course', 'Course')
+    Lesson = apps.get_model('lesson', 'Lesson')
+
+    def lessons(**filters):
+        return Lesson.objects.filter(course=OuterRef('pk'), **filters).order_by().values('course')
+
+    zero = Value(0, output_field=IntegerField())
+    Course.objects.update(
+        lessons_count=Coalesce(Subquery(lessons().annotate(n=Count('id')).values('n'), output_field=IntegerField()), zero),
+        published_lessons_count=Coalesce(Subquery(lessons(status='published').annotate(n=Count('id')).values('n'), output_field=IntegerField()), zero),
+        lessons_duration_min=Coalesce(Subquery(lessons().annotate(s=Sum('duration_min')).values('s'), output_field=IntegerField()), zero),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0001_initial'),
+        ('lesson', '0003_alter_lesson_unique_together_alter_lesson_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lessons_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='lessons_duration_min',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='published_lessons_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_lesson_counters, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,13 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.utils.text import slugify
 from django.db.models import Avg
 from decimal import Decimal, ROUND_HALF_UP
 from django.utils import timezone
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
 
 class Category(models.Model):
@@ -26,6 +30,17 @@ class Language(models.Model):
         return self.name
 
 
+# конфіг повнотекстового пошуку: контент переважно українською, а вбудованого
+# українського словника в PostgreSQL немає — тож без стемінгу
+COURSE_SEARCH_CONFIG = "simple"
+
+
+class CourseManager(models.Manager):
+    def get_queryset(self):
+        # tsvector потрібен лише базі (фільтр/ранжування) — у Python його не тягнемо
+        return super().get_queryset().defer("search_vector")
+
+
 class Course(models.Model):
     class Status(models.TextChoices):
         DRAFT = "draft", "Draft"
@@ -48,12 +63,32 @@ class Course(models.Model):
     created_at  = models.DateTimeField(auto_now_add=True)
     updated_at  = models.DateTimeField(auto_now=True)
 
+    # денормалізовані лічильники уроків — підтримуються сигналами app lesson,
+    # масовий перерахунок: manage.py rebuild_lesson_counters
+    lessons_count           = models.PositiveIntegerField(default=0, editable=False)
+    published_lessons_count = models.PositiveIntegerField(default=0, editable=False)
+    lessons_duration_min    = models.PositiveIntegerField(default=0, editable=False)
+
+    # зважений tsvector (title > topic > description), рахує і зберігає сама БД
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("title", weight="A", config=COURSE_SEARCH_CONFIG)
+            + SearchVector("topic", weight="B", config=COURSE_SEARCH_CONFIG)
+            + SearchVector("description", weight="C", config=COURSE_SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = CourseManager()
+
     class Meta:
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["slug"]),
             models.Index(fields=["status"]),
             models.Index(fields=["category"]),
+            GinIndex(fields=["search_vector"], name="course_search_vector_gin"),
         ]
 
     def __str__(self) -> str:
@@ -70,10 +105,10 @@ class Course(models.Model):
             self.slug = slug
         super().save(*args, **kwargs)
 
-    # допоміжні агрегати (не зберігаємо, щоб не плодити денормалізацію)
+    # сумісність зі старим API: читаємо колонку замість COUNT(*) на кожну картку
     @property
     def total_lessons(self) -> int:
-        return getattr(self, "lessons", None) and self.lessons.count() or 0
+        return self.lessons_count
 
     @property
     def average_rating(self) -> Decimal:
@@ -140,3 +175,15 @@ class Wishlist(models.Model):
 
     def __str__(self):
         return f"{self.user} → {getattr(self.course, 'title', self.course_id)}"
+
+
+# ---------- версія кешу публічного каталогу (course/cache.py) ----------
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+def bump_catalog_cache_version(sender, **kwargs):
+    from .cache import bump_catalog_version_on_commit
+    bump_catalog_version_on_commit()
@@ -3,6 +3,9 @@ from rest_framework import serializers
 from django.db.models import Count, Avg
 from .models import Course, Category, PurchasedCourse, Comment, Wishlist, Language, Comment
 from django.conf import settings
+from .filters import render_highlight
+from .services.entitlements import get_entitlements
+from brainboost.fieldsets import SparseFieldsetMixin
 
 # ===============================================================
 class CommentAuthorMiniSerializer(serializers.Serializer):
@@ -98,12 +101,26 @@ class AuthorMiniSerializer(serializers.Serializer):
     last_name = serializers.CharField()
 
 
-class CourseListSerializer(serializers.ModelSerializer):
+class SearchHighlightMixin:
+    """Підсвічені фрагменти з ?search= (анотації CourseFullTextSearchFilter), інакше None."""
+
+    def get_highlight(self, obj: Course):
+        if not hasattr(obj, "search_headline_title"):
+            return None
+        return {
+            "title": render_highlight(obj.search_headline_title),
+            "description": render_highlight(obj.search_headline_description),
+        }
+
+
+class CourseListSerializer(SparseFieldsetMixin, SearchHighlightMixin, serializers.ModelSerializer):
     author = AuthorMiniSerializer(source="author.__dict__", read_only=True)
     category_name = serializers.CharField(source="category.name", read_only=True)
     language_name = serializers.CharField(source="language.name", read_only=True)
     total_lessons = serializers.IntegerField(read_only=True)
     is_purchased = serializers.SerializerMethodField()
+    in_wishlist = serializers.SerializerMethodField()
+    highlight = serializers.SerializerMethodField()
     rating = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
 
     class Meta:
@@ -112,14 +129,23 @@ class CourseListSerializer(serializers.ModelSerializer):
             "id", "slug", "title", "description", "price", "language", "language_name", "topic",
             "image", "rating", "category", "category_name",
             "status", "created_at", "updated_at",
-            "total_lessons", "is_purchased", "author",
+            "total_lessons", "published_lessons_count", "lessons_duration_min",
+            "is_purchased", "in_wishlist", "author", "highlight",
         ]
-
+        # ?fields=/?omit=: що з моделі читають поля без прямого джерела
+        sparse_sources = {
+            "total_lessons": ("lessons_count",),
+            "is_purchased": (),
+            "in_wishlist": (),
+            "highlight": (),
+        }
+
+    # права беремо з кешу запиту — один запит на всю сторінку, а не по одному на курс
     def get_is_purchased(self, obj: Course) -> bool:
-        user = self.context.get("request") and self.context["request"].user or None
-        if not user or not user.is_authenticated:
-            return False
-        return PurchasedCourse.objects.filter(user=user, course=obj, is_active=True).exists()
+        return get_entitlements(self.context.get("request")).has_purchased(obj.id)
+
+    def get_in_wishlist(self, obj: Course) -> bool:
+        return get_entitlements(self.context.get("request")).in_wishlist(obj.id)
 
 
 class CourseDetailSerializer(CourseListSerializer):
@@ -127,6 +153,7 @@ class CourseDetailSerializer(CourseListSerializer):
 
     class Meta(CourseListSerializer.Meta):
         fields = CourseListSerializer.Meta.fields + ["average_rating"]
+        sparse_sources = {**CourseListSerializer.Meta.sparse_sources, "average_rating": ()}
 
     def get_average_rating(self, obj: Course):
         return obj.average_rating
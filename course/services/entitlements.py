@@ -0,0 +1,86 @@
+# course/services/entitlements.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+from django.db.models import CharField, Value
+
+from ..models import PurchasedCourse, Wishlist
+
+
+_PURCHASED = "purchased"
+_WISHLIST = "wishlist"
+
+# атрибут на HttpRequest, де живуть права поточного запиту
+_REQUEST_ATTR = "_course_entitlements"
+
+
+@dataclass(frozen=True)
+class Entitlements:
+    """Що користувач має щодо курсів: активні покупки та вішліст (множини course_id)."""
+    purchased_ids: FrozenSet[int] = frozenset()
+    wishlisted_ids: FrozenSet[int] = frozenset()
+
+    def has_purchased(self, course_id: Optional[int]) -> bool:
+        return course_id in self.purchased_ids
+
+    def in_wishlist(self, course_id: Optional[int]) -> bool:
+        return course_id in self.wishlisted_ids
+
+
+ANONYMOUS = Entitlements()
+
+
+def load_entitlements(user) -> Entitlements:
+    """
+    Один UNION ALL-запит: активні PurchasedCourse + Wishlist користувача.
+    """
+    if not user or not user.is_authenticated:
+        return ANONYMOUS
+
+    purchased = (
+        PurchasedCourse.objects
+        .filter(user=user, is_active=True)
+        .annotate(kind=Value(_PURCHASED, output_field=CharField()))
+        .order_by()
+        .values_list("course_id", "kind")
+    )
+    wished = (
+        Wishlist.objects
+        .filter(user=user)
+        .annotate(kind=Value(_WISHLIST, output_field=CharField()))
+        .order_by()
+        .values_list("course_id", "kind")
+    )
+
+    purchased_ids, wishlisted_ids = set(), set()
+    for course_id, kind in purchased.union(wished, all=True):
+        (purchased_ids if kind == _PURCHASED else wishlisted_ids).add(course_id)
+    return Entitlements(frozenset(purchased_ids), frozenset(wishlisted_ids))
+
+
+def get_entitlements(request) -> Entitlements:
+    """
+    Права користувача в межах одного HTTP-запиту.
+    Завантажуються ліниво при першому зверненні й спільні для всіх серіалізаторів
+    (зокрема вкладених) — скільки б курсів не було на сторінці, запит один.
+    """
+    if request is None:
+        return ANONYMOUS
+    # DRF Request обгортає HttpRequest — кешуємо на ньому, щоб усі обгортки бачили одне й те саме
+    holder = getattr(request, "_request", request)
+    cached = getattr(holder, _REQUEST_ATTR, None)
+    if cached is None:
+        cached = load_entitlements(getattr(request, "user", None))
+        setattr(holder, _REQUEST_ATTR, cached)
+    return cached
+
+
+def reset_entitlements(request) -> None:
+    """Скидає кеш запиту (після покупки/зміни вішліста в цьому ж запиті)."""
+    if request is None:
+        return
+    holder = getattr(request, "_request", request)
+    if hasattr(holder, _REQUEST_ATTR):
+        delattr(holder, _REQUEST_ATTR)
@@ -2,7 +2,7 @@
 
 from django.shortcuts import get_object_or_404
 from django.db import IntegrityError
-from django.db.models import Count
+from django.db.models import Count, Max
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, permissions, status, filters, parsers
 from rest_framework.response import Response
@@ -18,15 +18,20 @@ from .serializers import (
     CommentListSerializer,
 )
 from .permissions import IsCourseAuthorOrStaff, IsAuthorOrAdmin
+from .filters import CourseFullTextSearchFilter
+from .services.entitlements import get_entitlements, reset_entitlements
+from .cache import CatalogCacheMixin
+from brainboost.fieldsets import SparseQuerysetMixin
+from brainboost.conditional import ConditionalGetMixin, Validators, latest, make_etag
 
 
 # =========================
 #   CATEGORIES / LANGUAGES
 # =========================
 
-class CategoryListAPIView(generics.ListAPIView):
+class CategoryListAPIView(CatalogCacheMixin, generics.ListAPIView):
     """
-    GET /courses/categories/
+    GET /courses/categories/   (кешується до зміни каталогу)
     """
     queryset = Category.objects.all().annotate(courses_count=Count("courses"))
     serializer_class = CategorySerializer
@@ -159,15 +164,16 @@ class WishlistToggleView(APIView):
 #   COURSES
 # =========
 
-class CourseListCreateAPIView(generics.ListCreateAPIView):
+class CourseListCreateAPIView(SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     GET /courses/?author=me|<id>&page_size=...
     POST /courses/
     """
     parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
-    queryset = Course.objects.select_related("category", "author").all()
+    queryset = Course.objects.select_related("category", "author", "language").all()
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    # ?search= — повнотекстовий пошук по Course.search_vector (див. course/filters.py)
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, CourseFullTextSearchFilter]
     filterset_fields = {
         "category": ["exact", "in"],
         "language": ["exact", "in"],
@@ -179,6 +185,7 @@ class CourseListCreateAPIView(generics.ListCreateAPIView):
     search_fields = ["title", "description", "topic"]
     ordering_fields = ["price", "rating", "title", "created_at"]
     ordering = ["-created_at"]
+    cursor_ordering = ("-created_at", "id")   # ?paginate=cursor
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -206,17 +213,18 @@ class CourseListCreateAPIView(generics.ListCreateAPIView):
         serializer.save()
 
 
-class MyCoursesListAPIView(generics.ListAPIView):
+class MyCoursesListAPIView(SparseQuerysetMixin, generics.ListAPIView):
     """
     GET /courses/my/  (дзеркало можна підвісити і на /api/courses/my/)
     """
     serializer_class = CourseListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ("-created_at", "id")
 
     def get_queryset(self):
         return (
             Course.objects
-            .select_related("category", "author")
+            .select_related("category", "author", "language")
             .filter(author=self.request.user)
             .order_by("-created_at", "-id")
         )
@@ -227,15 +235,46 @@ class MyCoursesListAPIView(generics.ListAPIView):
         return ctx
 
 
-class CourseDetailAPIView(generics.RetrieveAPIView):
+def course_validators(request, **lookup):
+    """
+    ETag/Last-Modified для деталей курсу одним запитом без вибірки самого курсу:
+    updated_at, лічильники уроків, рейтинг, назви пов'язаних об'єктів,
+    кількість і max(updated_at) відгуків (average_rating), плюс покупка/вішліст користувача.
+    """
+    row = (
+        Course.objects.filter(**lookup)
+        .order_by()
+        .annotate(reviews_n=Count("reviews"), reviews_changed=Max("reviews__updated_at"))
+        .values(
+            "id", "updated_at", "rating",
+            "lessons_count", "published_lessons_count", "lessons_duration_min",
+            "category__name", "language__name",
+            "author__username", "author__first_name", "author__last_name",
+            "reviews_n", "reviews_changed",
+        )
+        .first()
+    )
+    if row is None:
+        return None
+    ent = get_entitlements(request)  # той самий кеш запиту, що й у серіалізатора
+    etag = make_etag([
+        *row.values(), ent.has_purchased(row["id"]), ent.in_wishlist(row["id"]),
+    ])
+    return Validators(etag, latest(row["updated_at"], row["reviews_changed"]))
+
+
+class CourseDetailAPIView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveAPIView):
     """
     GET /courses/<slug:slug>/   (деталі по slug — публічні)
     """
-    queryset = Course.objects.select_related("category", "author").all()
+    queryset = Course.objects.select_related("category", "author", "language").all()
     serializer_class = CourseDetailSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = "slug"
 
+    def get_validators(self, request, *args, **kwargs):
+        return course_validators(request, slug=kwargs["slug"])
+
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx.update({"request": self.request})
@@ -252,13 +291,13 @@ class CourseUpdateAPIView(generics.UpdateAPIView):
     lookup_field = "slug"
 
 
-class CourseRetrieveUpdateDestroyByIDAPIView(generics.RetrieveUpdateDestroyAPIView):
+class CourseRetrieveUpdateDestroyByIDAPIView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     GET    /courses/<int:pk>/      — публічний перегляд по ID
     PATCH  /courses/<int:pk>/      — оновлення (автор/стад)
     DELETE /courses/<int:pk>/      — видалення (автор/стад)
     """
-    queryset = Course.objects.select_related("category", "author").all()
+    queryset = Course.objects.select_related("category", "author", "language").all()
     lookup_field = "pk"
     parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
 
@@ -270,6 +309,9 @@ class CourseRetrieveUpdateDestroyByIDAPIView(generics.RetrieveUpdateDestroyAPIVi
     def get_serializer_class(self):
         return CourseDetailSerializer if self.request.method == "GET" else CourseCreateUpdateSerializer
 
+    def get_validators(self, request, *args, **kwargs):
+        return course_validators(request, pk=kwargs["pk"])
+
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx.update({"request": self.request})
@@ -291,10 +333,15 @@ class UserPurchasedCoursesView(generics.ListAPIView):
         return (
             PurchasedCourse.objects
             .filter(user=self.request.user, is_active=True)
-            .select_related("course")
+            .select_related("course__category", "course__author", "course__language")
             .order_by("-purchased_at", "-id")
         )
 
+    def get_serializer_context(self):
+        ctx = super().get_serializer_context()
+        ctx.update({"request": self.request})
+        return ctx
+
 
 class EnrollCourseView(APIView):
     """
@@ -310,6 +357,7 @@ class EnrollCourseView(APIView):
         if not created and not obj.is_active:
             obj.is_active = True
             obj.save(update_fields=["is_active"])
+        reset_entitlements(request)
         ser = PurchasedCourseSerializer(obj, context={"request": request})
         return Response(ser.data, status=201 if created else 200)
 
@@ -324,6 +372,7 @@ class CommentListCreateView(generics.ListCreateAPIView):
     """
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cursor_ordering = ("created_at", "id")
 
     def get_queryset(self):
         slug = self.kwargs.get("slug")
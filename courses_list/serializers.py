@@ -1,10 +1,13 @@
 from rest_framework import serializers
 from course.models import Course
+from course.serializers import SearchHighlightMixin
+from brainboost.fieldsets import SparseFieldsetMixin
 
 
-class PublicCourseCardSerializer(serializers.ModelSerializer):
+class PublicCourseCardSerializer(SparseFieldsetMixin, SearchHighlightMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source="category.name", read_only=True)
     author_name = serializers.SerializerMethodField()
+    highlight = serializers.SerializerMethodField()
     total_lessons = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -13,8 +16,14 @@ class PublicCourseCardSerializer(serializers.ModelSerializer):
             "id", "slug", "title", "description", "price",
             "language", "topic", "image", "rating",
             "category", "category_name", "status",
-            "total_lessons", "author_name", "created_at",
+            "total_lessons", "published_lessons_count", "lessons_duration_min",
+            "author_name", "created_at", "highlight",
         ]
+        sparse_sources = {
+            "author_name": ("author",),
+            "highlight": (),
+            "total_lessons": ("lessons_count",),
+        }
 
     def get_author_name(self, obj):
         u = getattr(obj, "author", None)
@@ -22,3 +31,12 @@ class PublicCourseCardSerializer(serializers.ModelSerializer):
             return ""
         full = (getattr(u, "first_name", "") + " " + getattr(u, "last_name", "")).strip()
         return full or getattr(u, "username", "")
+
+
+class CourseFacetsQuerySerializer(serializers.Serializer):
+    """Обрані фасети з query string (?category=&language=&price__gte=&price__lte=&rating__gte=)."""
+    category = serializers.IntegerField(required=False)
+    language = serializers.IntegerField(required=False)
+    price__gte = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    price__lte = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    rating__gte = serializers.DecimalField(max_digits=3, decimal_places=2, required=False)
@@ -0,0 +1,116 @@
+# courses_list/services/facets.py
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Optional
+
+from django.db.models import BooleanField, Case, CharField, Count, Q, Value, When
+from django.db.models.functions import Floor
+
+# (ключ, від включно, до виключно); None — відкрита межа
+PRICE_BUCKETS = (
+    ("free", Decimal("0"), Decimal("0.01")),
+    ("lt_500", Decimal("0.01"), Decimal("500")),
+    ("500_1000", Decimal("500"), Decimal("1000")),
+    ("1000_2000", Decimal("1000"), Decimal("2000")),
+    ("gte_2000", Decimal("2000"), None),
+)
+
+# фасет рейтингу кумулятивний — так само, як фільтр ?rating__gte=
+RATING_THRESHOLDS = (4, 3, 2, 1)
+
+
+def _price_bucket_expr():
+    whens = []
+    for key, low, high in PRICE_BUCKETS:
+        cond = Q(price__gte=low)
+        if high is not None:
+            cond &= Q(price__lt=high)
+        whens.append(When(cond, then=Value(key)))
+    return Case(*whens, default=Value(PRICE_BUCKETS[-1][0]), output_field=CharField())
+
+
+def _match_expr(q: Optional[Q]):
+    if q is None:
+        return Value(True, output_field=BooleanField())
+    return Case(When(q, then=Value(True)), default=Value(False), output_field=BooleanField())
+
+
+def compute_course_facets(queryset, selected: dict) -> dict:
+    """
+    Лічильники для сайдбару фільтрів: категорії, мови, цінові та рейтингові діапазони.
+
+    queryset — опубліковані курси з уже застосованими НЕфасетними фільтрами (пошук, topic).
+    selected — обрані фасети: category, language, price__gte, price__lte, rating__gte.
+
+    Один GROUP BY по (категорія, мова, ціновий бакет, floor(rating), збіг ціни, збіг рейтингу);
+    далі все згортається в Python. Кожен фасет рахується з урахуванням усіх інших обраних
+    фасетів, але не себе — інакше після кліку на категорію решта категорій показала б 0.
+    """
+    price_q = None
+    if selected.get("price__gte") is not None:
+        price_q = Q(price__gte=selected["price__gte"])
+    if selected.get("price__lte") is not None:
+        lte = Q(price__lte=selected["price__lte"])
+        price_q = lte if price_q is None else price_q & lte
+    rating_q = Q(rating__gte=selected["rating__gte"]) if selected.get("rating__gte") is not None else None
+
+    rows = (
+        queryset
+        .order_by()
+        .annotate(
+            price_bucket=_price_bucket_expr(),
+            rating_floor=Floor("rating"),
+            price_match=_match_expr(price_q),
+            rating_match=_match_expr(rating_q),
+        )
+        .values(
+            "category_id", "category__name", "language_id", "language__name",
+            "price_bucket", "rating_floor", "price_match", "rating_match",
+        )
+        .annotate(n=Count("id"))
+    )
+
+    category = selected.get("category")
+    language = selected.get("language")
+
+    categories: dict = {}
+    languages: dict = {}
+    prices = defaultdict(int)
+    ratings = defaultdict(int)
+    total = 0
+
+    for row in rows:
+        n = row["n"]
+        ok_category = category is None or row["category_id"] == category
+        ok_language = language is None or row["language_id"] == language
+        ok_price = row["price_match"]
+        ok_rating = row["rating_match"]
+
+        if ok_category and ok_language and ok_price and ok_rating:
+            total += n
+        if ok_language and ok_price and ok_rating and row["category_id"] is not None:
+            entry = categories.setdefault(row["category_id"], {"id": row["category_id"], "name": row["category__name"], "count": 0})
+            entry["count"] += n
+        if ok_category and ok_price and ok_rating and row["language_id"] is not None:
+            entry = languages.setdefault(row["language_id"], {"id": row["language_id"], "name": row["language__name"], "count": 0})
+            entry["count"] += n
+        if ok_category and ok_language and ok_rating:
+            prices[row["price_bucket"]] += n
+        if ok_category and ok_language and ok_price:
+            ratings[int(row["rating_floor"] or 0)] += n
+
+    return {
+        "total": total,
+        "categories": sorted(categories.values(), key=lambda c: c["name"]),
+        "languages": sorted(languages.values(), key=lambda c: c["name"]),
+        "price": [
+            {"key": key, "min": str(low), "max": str(high) if high is not None else None, "count": prices.get(key, 0)}
+            for key, low, high in PRICE_BUCKETS
+        ],
+        "rating": [
+            {"min": t, "count": sum(n for floor, n in ratings.items() if floor >= t)}
+            for t in RATING_THRESHOLDS
+        ],
+    }
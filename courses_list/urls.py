@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import PublicCourseListAPIView, PublicCourseDetailAPIView
+from .views import PublicCourseListAPIView, PublicCourseDetailAPIView, PublicCourseFacetsAPIView
 
 urlpatterns = [
     path("", PublicCourseListAPIView.as_view(), name="public-course-list"),
+    path("facets/", PublicCourseFacetsAPIView.as_view(), name="public-course-facets"),
     path("<slug:slug>/", PublicCourseDetailAPIView.as_view(), name="public-course-detail"),
 ]
@@ -1,19 +1,25 @@
 from django.db.models import Count, Avg
 from rest_framework import generics, permissions, filters
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
 
 from course.models import Course
-from .serializers import PublicCourseCardSerializer
+from course.filters import CourseFullTextSearchFilter, build_course_search_query
+from course.cache import CatalogCacheMixin
+from brainboost.fieldsets import SparseQuerysetMixin
+from .serializers import PublicCourseCardSerializer, CourseFacetsQuerySerializer
+from .services.facets import compute_course_facets
 
 
-class PublicCourseListAPIView(generics.ListAPIView):
+class PublicCourseListAPIView(CatalogCacheMixin, SparseQuerysetMixin, generics.ListAPIView):
     """
     Публічний каталог курсів з фільтрами/сортуванням/пошуком.
-    Видає лише опубліковані курси.
+    Видає лише опубліковані курси. Сторінки кешуються (див. course/cache.py).
     """
     permission_classes = [permissions.AllowAny]
     serializer_class = PublicCourseCardSerializer
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, CourseFullTextSearchFilter]
     filterset_fields = {
         "category": ["exact"],
         "price": ["lte", "gte"],
@@ -24,6 +30,7 @@ class PublicCourseListAPIView(generics.ListAPIView):
     search_fields = ["title", "description", "topic"]
     ordering_fields = ["price", "rating", "title", "created_at"]
     ordering = ["-created_at"]
+    cursor_ordering = ("-created_at", "id")   # ?paginate=cursor — без COUNT/OFFSET
 
     def get_queryset(self):
         # select_related для продуктивності
@@ -31,7 +38,37 @@ class PublicCourseListAPIView(generics.ListAPIView):
         return qs
 
 
-class PublicCourseDetailAPIView(generics.RetrieveAPIView):
+class PublicCourseFacetsAPIView(CatalogCacheMixin, generics.GenericAPIView):
+    """
+    GET /api/courses/all/facets/ — лічильники для сайдбару фільтрів каталогу.
+    Приймає ті самі параметри, що й список (category, language, price__gte/lte,
+    rating__gte, topic__icontains, search). Один агрегуючий запит, результат кешується.
+    """
+    permission_classes = [permissions.AllowAny]
+    catalog_cache_prefix = "facets"
+
+    def get_queryset(self):
+        qs = Course.objects.filter(status=Course.Status.PUBLISHED)
+        topic = self.request.query_params.get("topic__icontains")
+        if topic:
+            qs = qs.filter(topic__icontains=topic)
+        query = build_course_search_query(self.request.query_params.get(api_settings.SEARCH_PARAM, ""))
+        if query is not None:
+            qs = qs.filter(search_vector=query)
+        return qs
+
+    def get(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
+    def uncached_list(self, request, *args, **kwargs):
+        # list() — з CatalogCacheMixin, він кешує те, що повертає цей метод
+        # порожні ?category= тощо ігноруємо, як і django-filter у списку
+        params = CourseFacetsQuerySerializer(data={k: v for k, v in request.query_params.items() if v != ""})
+        params.is_valid(raise_exception=True)
+        return Response(compute_course_facets(self.get_queryset(), params.validated_data))
+
+
+class PublicCourseDetailAPIView(SparseQuerysetMixin, generics.RetrieveAPIView):
     """
     Публічна детальна сторінка по slug.
     """
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from django.contrib import admin, messages
+from django.db.models import F
 from django.utils import timezone
 from django.utils.html import format_html
 from django import forms
 
 from .models import Lesson, Module, LessonContent, LessonProgress
+from .services.ordering import respace
+from .services.outline import bump_course_outlines
+from .services.publishing import refresh_after_status_change
+from .services.student_payload import bump_lesson_versions
 
 
 # ====== ЗАГАЛЬНІ НАЛАШТУВАННЯ ======
@@ -58,27 +63,31 @@ class ModuleAdmin(admin.ModelAdmin):
 
     @admin.action(description="Зробити видимими")
     def make_visible(self, request, queryset):
+        course_ids = set(queryset.values_list("course_id", flat=True))   # до update(): фільтр is_visible
         n = queryset.update(is_visible=True)
+        bump_course_outlines(course_ids)
         self.message_user(request, f"Оновлено {n} модулів: видимі.", messages.SUCCESS)
 
     @admin.action(description="Приховати")
     def make_hidden(self, request, queryset):
+        course_ids = set(queryset.values_list("course_id", flat=True))   # до update(): фільтр is_visible
         n = queryset.update(is_visible=False)
+        bump_course_outlines(course_ids)
         self.message_user(request, f"Оновлено {n} модулів: приховані.", messages.SUCCESS)
 
-    @admin.action(description="Нормалізувати порядок (1..N)")
+    @admin.action(description="Нормалізувати порядок (рівні проміжки)")
     def normalize_order(self, request, queryset):
-        # Всередині кожного курсу відсортуємо модулі за поточним order,id і перенумеруємо
+        # Всередині кожного курсу відсортуємо модулі за поточним order,id і розставимо ранги
+        # з кроком RANK_GAP; пишемо одним bulk_update лише змінені рядки
         by_course = {}
         for m in queryset.order_by("course", "order", "id"):
             by_course.setdefault(m.course_id, []).append(m)
-        total = 0
-        for _, mods in by_course.items():
-            for idx, m in enumerate(mods, start=1):
-                if m.order != idx:
-                    m.order = idx
-                    m.save(update_fields=["order"])
-                    total += 1
+        changed = [m for mods in by_course.values() for m in respace(mods)]
+        if changed:
+            Module.objects.bulk_update(changed, ["order"])
+            bump_lesson_versions(module_id__in=[m.id for m in changed])
+            bump_course_outlines(m.course_id for m in changed)
+        total = len(changed)
         self.message_user(request, f"Переупорядковано елементів: {total}.", messages.INFO)
 
 
@@ -173,26 +182,34 @@ class LessonAdmin(admin.ModelAdmin):
     # ---- дії ----
     @admin.action(description="Опублікувати вибрані (status='published')")
     def mark_published(self, request, queryset):
-        n = queryset.update(status="published", published_at=timezone.now())
+        # курси — ДО update(): з фільтром changelist (напр. status=draft) повторний запит був би порожнім
+        course_ids = set(queryset.values_list("course_id", flat=True))
+        now = timezone.now()
+        # update() оминає auto_now — updated_at (Last-Modified) виставляємо разом з версією (ETag)
+        n = queryset.update(status="published", published_at=now, version=F("version") + 1, updated_at=now)
+        # update() оминає сигнали — лічильники курсів, зведений прогрес і зміст оновлюємо явно
+        refresh_after_status_change(course_ids)
         self.message_user(request, f"Опубліковано уроків: {n}.", messages.SUCCESS)
 
     @admin.action(description="Зробити чернеткою (status='draft')")
     def mark_draft(self, request, queryset):
-        n = queryset.update(status="draft")
+        course_ids = set(queryset.values_list("course_id", flat=True))
+        n = queryset.update(status="draft", version=F("version") + 1, updated_at=timezone.now())
+        refresh_after_status_change(course_ids)
         self.message_user(request, f"Переведено у чернетку уроків: {n}.", messages.INFO)
 
-    @admin.action(description="Нормалізувати порядок в межах кожного модуля (1..N)")
+    @admin.action(description="Нормалізувати порядок в межах кожного модуля (рівні проміжки)")
     def reseq_in_module(self, request, queryset):
         by_module = {}
-        for l in queryset.order_by("module", "order", "id"):
-            by_module.setdefault(l.module_id, []).append(l)
-        total = 0
-        for _, lessons in by_module.items():
-            for idx, l in enumerate(lessons, start=1):
-                if l.order != idx:
-                    l.order = idx
-                    l.save(update_fields=["order"])
-                    total += 1
+        for l in queryset.order_by("course", "module", "order", "id"):
+            by_module.setdefault((l.course_id, l.module_id), []).append(l)
+        changed = [l for lessons in by_module.values() for l in respace(lessons)]
+        if changed:
+            # bulk_update оминає сигнали Lesson — версії та зміст курсу піднімаємо явно
+            Lesson.objects.bulk_update(changed, ["order"])
+            bump_lesson_versions(pk__in=[l.id for l in changed])
+            bump_course_outlines(l.course_id for l in changed)
+        total = len(changed)
         self.message_user(request, f"Переупорядковано позицій: {total}.", messages.INFO)
 
 
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from lesson.services.publishing import publish_due_lessons
+
+
+class Command(BaseCommand):
+    help = 'Публікація запланованих уроків (status=scheduled, scheduled_at настав)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Працювати безперервно, перевіряючи кожні --interval секунд (окремий процес).')
+        parser.add_argument('--interval', type=int, default=60,
+                            help='Пауза між перевірками в режимі --loop, секунд (за замовчуванням 60).')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Скільки уроків публікувати за одну транзакцію (за замовчуванням 500).')
+
+    def handle(self, *args, **options):
+        batch = max(1, options['batch_size'])
+        if not options['loop']:
+            n = publish_due_lessons(batch_size=batch)
+            self.stdout.write(self.style.SUCCESS(f'Опубліковано уроків: {n}'))
+            return
+
+        interval = max(1, options['interval'])
+        try:
+            while True:
+                n = publish_due_lessons(batch_size=batch)
+                if n:
+                    self.stdout.write(f'Опубліковано уроків: {n}')
+                close_old_connections()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Зупинено.')
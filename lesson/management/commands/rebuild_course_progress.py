@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from course.models import Course
+from lesson.services.progress import refresh_course_progress
+
+
+class Command(BaseCommand):
+    help = 'Перерахунок зведеного прогресу користувачів по курсах (CourseProgress) пачками курсів'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='courses',
+                            help='ID курсу (можна кілька разів). Без параметра — усі курси.')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Скільки курсів перераховувати за один агрегат (за замовчуванням 200).')
+
+    def handle(self, *args, **options):
+        if options['courses']:
+            n = refresh_course_progress(options['courses'])
+            self.stdout.write(self.style.SUCCESS(f'Оновлено записів прогресу: {n}'))
+            return
+
+        batch = max(1, options['batch_size'])
+        ids = list(Course.objects.order_by('pk').values_list('pk', flat=True))
+        total = 0
+        for i in range(0, len(ids), batch):
+            total += refresh_course_progress(ids[i:i + batch])
+        self.stdout.write(self.style.SUCCESS(f'Оновлено записів прогресу: {total}'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from course.models import Course
+from lesson.services.counters import refresh_course_lesson_counters
+
+
+class Command(BaseCommand):
+    help = 'Перерахунок денормалізованих лічильників уроків (Course.lessons_count тощо) пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='courses',
+                            help='ID курсу (можна кілька разів). Без параметра — усі курси.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Скільки курсів оновлювати одним UPDATE (за замовчуванням 1000).')
+
+    def handle(self, *args, **options):
+        if options['courses']:
+            n = refresh_course_lesson_counters(options['courses'])
+            self.stdout.write(self.style.SUCCESS(f'Оновлено курсів: {n}'))
+            return
+
+        batch = max(1, options['batch_size'])
+        ids = list(Course.objects.order_by('pk').values_list('pk', flat=True))
+        total = 0
+        for i in range(0, len(ids), batch):
+            total += refresh_course_lesson_counters(ids[i:i + batch])
+        self.stdout.write(self.style.SUCCESS(f'Оновлено курсів: {total}'))
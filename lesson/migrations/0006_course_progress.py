@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, IntegerField, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_course_progress(apps, schema_editor):
+    """Зведені рядки для вже наявного LessonProgress — інакше завершені до деплою курси «не завершені»."""
+    CourseProgress = apps.get_model('lesson', 'CourseProgress')
+    Lesson = apps.get_model('lesson', 'Lesson')
+    LessonProgress = apps.get_model('lesson', 'LessonProgress')
+
+    published = Q(lesson__status='published')
+    total = Coalesce(
+        Subquery(
+            Lesson.objects.filter(course=OuterRef('lesson__course'), status='published')
+            .order_by().values('course').annotate(n=Count('id')).values('n'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+    rows = (
+        LessonProgress.objects.order_by()
+        .values('user_id', 'lesson__course_id')
+        .annotate(
+            completed=Count('id', filter=published & Q(state='completed')),
+            avg_percent=Avg('result_percent', filter=published),
+            last_activity=Max('updated_at'),
+            total=total,
+        )
+    )
+    batch = []
+    for r in rows.iterator(chunk_size=2000):
+        batch.append(CourseProgress(
+            user_id=r['user_id'],
+            course_id=r['lesson__course_id'],
+            lessons_completed=r['completed'],
+            lessons_total=r['total'],
+            avg_result_percent=r['avg_percent'],
+            last_activity=r['last_activity'],
+        ))
+        if len(batch) >= 2000:
+            CourseProgress.objects.bulk_create(batch)
+            batch = []
+    CourseProgress.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0003_course_search_vector'),
+        ('lesson', '0005_lesson_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lessons_completed', models.PositiveIntegerField(default=0)),
+                ('lessons_total', models.PositiveIntegerField(default=0)),
+                ('avg_result_percent', models.FloatField(blank=True, null=True)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='course.course')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'course')},
+            },
+        ),
+        migrations.RunPython(backfill_course_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lesson', '0006_course_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='client_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0003_course_search_vector'),
+        ('lesson', '0007_lessonprogress_client_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(condition=models.Q(('status', 'scheduled')), fields=['status', 'scheduled_at'], name='lesson_scheduled_idx'),
+        ),
+    ]
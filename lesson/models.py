@@ -1,6 +1,10 @@
 from django.db import models
 from django.conf import settings
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
 from course.models import Course
+from brainboost.deletion import deleted_directly, refresh_on_delete
+from brainboost.versioning import VersionedModelMixin
 
 
 class Module(models.Model):
@@ -19,7 +23,7 @@ class Module(models.Model):
         return f'{self.course.title} — {self.title}'
 
 
-class Lesson(models.Model):
+class Lesson(VersionedModelMixin, models.Model):
     class Status(models.TextChoices):
         DRAFT     = 'draft', 'Draft'
         SCHEDULED = 'scheduled', 'Scheduled'
@@ -45,6 +49,8 @@ class Lesson(models.Model):
 
     created_at   = models.DateTimeField(auto_now_add=True)
     updated_at   = models.DateTimeField(auto_now=True)
+    # росте при будь-якій зміні уроку, його блоків чи модуля: ключ кешу студентського JSON і ETag
+    version      = models.PositiveIntegerField(default=1, editable=False)
 
     class Meta:
         ordering = ['order', 'id']
@@ -52,12 +58,26 @@ class Lesson(models.Model):
             models.Index(fields=['course']),
             models.Index(fields=['module']),
             models.Index(fields=['status']),
+            # воркер відкладеної публікації: лише заплановані уроки, за часом (services/publishing.py)
+            models.Index(fields=['status', 'scheduled_at'], name='lesson_scheduled_idx',
+                         condition=models.Q(status='scheduled')),
         ]
         # ⬇️ важливо: НЕ обмежуємо унікальність (course, title) і НЕ робимо slug унікальним
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # знімок полів, від яких залежать лічильники курсу (див. сигнали нижче)
+        instance._counters_snapshot = instance._counters_state()
+        return instance
+
+    def _counters_state(self):
+        d = self.__dict__
+        return d.get('course_id'), d.get('status'), d.get('duration_min')
+
 
 class LessonContent(models.Model):
     """
@@ -81,6 +101,7 @@ class LessonContent(models.Model):
     data      = models.JSONField(default=dict, blank=True)
     order     = models.PositiveIntegerField(default=0, db_index=True)
     is_hidden = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['order', 'id']
@@ -103,6 +124,8 @@ class LessonProgress(models.Model):
     started_at     = models.DateTimeField(null=True, blank=True)
     completed_at   = models.DateTimeField(null=True, blank=True)
     updated_at     = models.DateTimeField(auto_now=True)
+    # час події на клієнті (офлайн-синхронізація): перемагає пізніший запис, а не пізніший запит
+    client_updated_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = [('user', 'lesson')]
@@ -112,4 +135,94 @@ class LessonProgress(models.Model):
         ]
 
     def __str__(self):
-        return f'{self.user} — {self.lesson} — {self.state}'
\ No newline at end of file
+        return f'{self.user} — {self.lesson} — {self.state}'
+
+
+class CourseProgress(models.Model):
+    """
+    Зведений прогрес користувача по курсу (lesson/services/progress.py):
+    оновлюється з LessonProgressUpsertView та при публікації/знятті уроків,
+    тож перевірка «курс пройдено» — один запит по унікальному (user, course).
+    """
+    user               = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='course_progress')
+    course             = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='progress')
+    lessons_completed  = models.PositiveIntegerField(default=0)   # завершені ОПУБЛІКОВАНІ уроки
+    lessons_total      = models.PositiveIntegerField(default=0)   # опубліковані уроки курсу
+    avg_result_percent = models.FloatField(null=True, blank=True)
+    last_activity      = models.DateTimeField(null=True, blank=True)
+    updated_at         = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [('user', 'course')]
+
+    def __str__(self):
+        return f'{self.user} — {self.course} — {self.lessons_completed}/{self.lessons_total}'
+
+    @property
+    def is_completed(self) -> bool:
+        return self.lessons_total > 0 and self.lessons_completed >= self.lessons_total
+
+
+# ---------- лічильники уроків на Course ----------
+def _published_course(state):
+    """(курс, чи опублікований) зі знімка _counters_state()."""
+    return state[0], state[1] == Lesson.Status.PUBLISHED
+
+
+@receiver(post_save, sender=Lesson)
+def refresh_course_counters_on_lesson_save(sender, instance: Lesson, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_counters_snapshot', None)
+    after = instance._counters_state()
+    # зміст курсу (назви, порядок, модулі) — на кожне збереження; before[0] — старий курс
+    from .services.outline import bump_course_outlines
+    bump_course_outlines({instance.course_id, before[0] if before else None})
+    if created or before != after:
+        from .services.counters import refresh_course_lesson_counters
+        # before[0] — старий курс, якщо урок перенесли
+        refresh_course_lesson_counters({instance.course_id, before[0] if before else None})
+
+        # новий урок «був» неопублікованим у своєму ж курсі
+        if _published_course(before or (after[0], None)) != _published_course(after):
+            # змінився набір опублікованих уроків курсу — зведений прогрес (lessons_total/completed)
+            from .services.progress import refresh_course_progress
+            refresh_course_progress({instance.course_id, before[0] if before else None})
+    instance._counters_snapshot = after
+
+
+@receiver(post_delete, sender=Lesson)
+def refresh_course_counters_on_lesson_delete(sender, instance: Lesson, origin=None, **kwargs):
+    # видалення курсу — нічого перераховувати; пачка уроків одного курсу — один перерахунок
+    if not refresh_on_delete(origin, Lesson, ('course', instance.course_id)):
+        return
+    from .services.counters import refresh_course_lesson_counters
+    from .services.outline import bump_course_outlines
+    from .services.progress import refresh_course_progress
+    refresh_course_lesson_counters({instance.course_id})
+    refresh_course_progress({instance.course_id})
+    bump_course_outlines({instance.course_id})
+
+
+# ---------- версія уроку (кеш студентського JSON, ETag) ----------
+@receiver(post_save, sender=LessonContent)
+@receiver(post_delete, sender=LessonContent)
+def bump_lesson_version_on_block_change(sender, instance: LessonContent, raw=False, origin=None, **kwargs):
+    # origin є лише у сигналах видалення: урок, що видаляється разом з блоками, не бампаємо
+    if raw or not refresh_on_delete(origin, LessonContent, ('lesson', instance.lesson_id)):
+        return
+    from .services.student_payload import note_lesson_changed
+    note_lesson_changed(instance.lesson_id)
+
+
+@receiver(post_save, sender=Module)
+@receiver(pre_delete, sender=Module)
+def bump_lesson_version_on_module_change(sender, instance: Module, raw=False, origin=None, **kwargs):
+    # pre_delete: після видалення уроки вже матимуть module=NULL (SET_NULL без сигналів);
+    # модулі курсу, що видаляється, пропускаємо — його уроки зникнуть разом з ним
+    if raw or not deleted_directly(origin, Module):
+        return
+    from .services.outline import bump_course_outlines
+    from .services.student_payload import bump_lesson_versions
+    bump_lesson_versions(module_id=instance.pk)
+    bump_course_outlines({instance.course_id})
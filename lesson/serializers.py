@@ -6,6 +6,9 @@ from django.db.models import Max
 from rest_framework import serializers
 
 from .models import Module, Lesson, LessonContent, LessonProgress
+from brainboost.fieldsets import SparseFieldsetMixin
+from .services.blocks import reconcile_lesson_blocks
+from .services.ordering import RANK_GAP, next_rank
 
 
 # ---------- Modules ----------
@@ -15,6 +18,12 @@ class ModuleSerializer(serializers.ModelSerializer):
         fields = ['id', 'course', 'title', 'description', 'order', 'is_visible']
 
 
+class LessonBlockOpsSerializer(serializers.Serializer):
+    """Пакет операцій автозбереження; форма кожної операції (400 з її індексом) — у services/blocks.apply_block_ops."""
+    base_version = serializers.IntegerField(min_value=0)
+    ops = serializers.ListField(child=serializers.DictField(), allow_empty=True, max_length=500)
+
+
 class ModuleReorderSerializer(serializers.Serializer):
     items = serializers.ListField(
         child=serializers.DictField(child=serializers.IntegerField()),
@@ -76,7 +85,7 @@ class LessonBlockSerializer(serializers.ModelSerializer):
 
 
 # ---------- Lessons ----------
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     contents = LessonBlockSerializer(many=True, required=False)
 
     # READ: nested module (може бути null)
@@ -106,9 +115,9 @@ class LessonSerializer(serializers.ModelSerializer):
             'duration_min', 'cover_image',
             'contents',
             'type', 'content_text', 'content_url',
-            'created_at', 'updated_at',
+            'created_at', 'updated_at', 'version',
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'version']
 
     # --- Мапимо body.module/qp ?module у module_id ---
     def to_internal_value(self, data):
@@ -173,8 +182,7 @@ class LessonSerializer(serializers.ModelSerializer):
             qs = Lesson.objects.filter(course=attrs.get('course'))
             if attrs.get('module'):
                 qs = qs.filter(module=attrs['module'])
-            last = qs.aggregate(mx=Max('order'))['mx'] or 0
-            attrs['order'] = last + 1
+            attrs['order'] = next_rank(qs.aggregate(mx=Max('order'))['mx'])
 
         # ще раз, раптом змінився тип
         synth = self._flat_to_contents(initial | attrs)
@@ -198,7 +206,7 @@ class LessonSerializer(serializers.ModelSerializer):
                     lesson=lesson,
                     type=c['type'],
                     data=c.get('data', {}),
-                    order=i,
+                    order=(i + 1) * RANK_GAP,
                     is_hidden=c.get('is_hidden', False),
                 ) for i, c in enumerate(contents)
             ]
@@ -213,20 +221,9 @@ class LessonSerializer(serializers.ModelSerializer):
             setattr(instance, k, v)
         instance.save()
 
-        # повна заміна масиву блоків (якщо передали)
+        # contents — повний новий стан: звіряємо з поточним за id, пишемо лише різницю
         if contents is not None:
-            instance.contents.all().delete()
-            bulk = [
-                LessonContent(
-                    lesson=instance,
-                    type=c['type'],
-                    data=c.get('data', {}),
-                    order=i,
-                    is_hidden=c.get('is_hidden', False),
-                ) for i, c in enumerate(contents)
-            ]
-            if bulk:
-                LessonContent.objects.bulk_create(bulk)
+            reconcile_lesson_blocks(instance, contents)
         return instance
 
 
@@ -237,7 +234,19 @@ class LessonProgressSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'started_at', 'completed_at', 'updated_at']
 
 
-class LessonPublicListWithProgressSerializer(serializers.ModelSerializer):
+class LessonProgressEventSerializer(serializers.Serializer):
+    lesson_id = serializers.IntegerField(min_value=1)
+    state = serializers.ChoiceField(choices=[LessonProgress.State.STARTED, LessonProgress.State.COMPLETED])
+    result_percent = serializers.IntegerField(min_value=0, max_value=100, required=False, allow_null=True)
+    client_ts = serializers.DateTimeField(help_text="Коли подія сталася на клієнті (ISO 8601).")
+
+
+class LessonProgressSyncSerializer(serializers.Serializer):
+    """Пакет подій прогресу від клієнта, що повернувся онлайн."""
+    events = LessonProgressEventSerializer(many=True, allow_empty=False, max_length=500)
+
+
+class LessonPublicListWithProgressSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Публічний список уроків із прогресом для сторінок курсу/розділів.
     """
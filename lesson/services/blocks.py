@@ -0,0 +1,238 @@
+# lesson/services/blocks.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from ..models import Lesson, LessonContent
+from .ordering import plan_ranks
+from .student_payload import deferred_lesson_bumps, note_lesson_changed
+
+# поля блоку, які редактор може змінювати
+BLOCK_FIELDS = ('type', 'data', 'order', 'is_hidden')
+
+
+@dataclass
+class BlockChanges:
+    created: List[LessonContent] = field(default_factory=list)
+    updated: List[LessonContent] = field(default_factory=list)
+    deleted_ids: List[int] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.created or self.updated or self.deleted_ids)
+
+
+def _block_values(item: Dict[str, Any], rank: int) -> Dict[str, Any]:
+    return {
+        'type': item['type'],
+        'data': item.get('data', {}),
+        'order': rank,
+        'is_hidden': item.get('is_hidden', False),
+    }
+
+
+@transaction.atomic
+def reconcile_lesson_blocks(
+    lesson: Lesson,
+    incoming: Iterable[Dict[str, Any]],
+    existing: Optional[Dict[int, LessonContent]] = None,
+) -> BlockChanges:
+    """
+    Приводить блоки уроку до incoming (повний упорядкований список, як contents у LessonSerializer).
+
+    - блок з id, що належить уроку, — оновлюється, і лише якщо щось справді змінилось;
+    - блок без id (або з чужим/повторним id) — створюється;
+    - існуючі блоки, яких немає в incoming, — видаляються.
+    order — розріджений ранг (services/ordering.py): блоки, що лишились на місці, ранг зберігають,
+    тож вставка чи переміщення одного блоку не переписує order решти.
+    Один SELECT і максимум три записи (DELETE, UPDATE, INSERT);
+    id незмінених/оновлених блоків зберігаються (на них посилається Chat.theory).
+    existing — вже завантажені блоки уроку {id: block}, якщо викликач їх має.
+    """
+    if existing is None:
+        existing = {b.id: b for b in LessonContent.objects.filter(lesson=lesson)}
+    changes = BlockChanges()
+    seen = set()
+    changed_fields = set()
+    now = timezone.now()
+
+    incoming = list(incoming)
+    matched = []
+    for item in incoming:
+        block = existing.get(item.get('id'))
+        if block is not None and block.id not in seen:
+            seen.add(block.id)
+            matched.append(block)
+        else:
+            matched.append(None)
+    planned = plan_ranks([(position, block.order if block else None) for position, block in enumerate(matched)])
+
+    for position, (item, block) in enumerate(zip(incoming, matched)):
+        values = _block_values(item, planned.get(position, block.order if block else None))
+        if block is None:
+            changes.created.append(LessonContent(lesson=lesson, **values))
+            continue
+        diff = [name for name, value in values.items() if getattr(block, name) != value]
+        if diff:
+            for name in diff:
+                setattr(block, name, values[name])
+            block.updated_at = now
+            changed_fields.update(diff)
+            changes.updated.append(block)
+
+    changes.deleted_ids = [pk for pk in existing if pk not in seen]
+
+    # сигнали видалених блоків не б'ють по Lesson.version поодинці — один bump нижче
+    with deferred_lesson_bumps():
+        if changes.deleted_ids:
+            LessonContent.objects.filter(pk__in=changes.deleted_ids).delete()
+        if changes.updated:
+            LessonContent.objects.bulk_update(changes.updated, [*sorted(changed_fields), 'updated_at'])
+        if changes.created:
+            LessonContent.objects.bulk_create(changes.created)
+        if changes:
+            note_lesson_changed(lesson.id)
+    return changes
+
+
+# ---------- пакетні операції автозбереження редактора ----------
+class StaleLessonVersion(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Урок змінено в іншій сесії — перезавантажте блоки.'
+    default_code = 'stale_version'
+
+    def __init__(self, version: int):
+        super().__init__()
+        # поточна версія — числом, щоб клієнт міг одразу перечитати блоки
+        self.detail = {'detail': self.detail, 'version': version}
+
+
+BLOCK_OPS = ('insert', 'update', 'move', 'delete')
+_MISSING = object()
+
+
+def _op_error(index: int, message: str):
+    return serializers.ValidationError({'ops': {str(index): [message]}})
+
+
+def _is_ref(value) -> bool:
+    # bool — підклас int, але id блоку не буває True/False
+    return value is None or isinstance(value, str) or (isinstance(value, int) and not isinstance(value, bool))
+
+
+def _check_op_shape(index: int, op: Dict[str, Any]) -> None:
+    """Форма однієї операції до будь-якої роботи з БД: інакше 'block': "x" чи 'id': [] дали б 500."""
+    kind = op.get('op')
+    if kind not in BLOCK_OPS:
+        raise _op_error(index, f'Невідома операція {kind!r}; очікується одна з {", ".join(BLOCK_OPS)}.')
+    block = op.get('block')
+    if block is not None and not isinstance(block, dict):
+        raise _op_error(index, f"{kind}: block має бути об'єктом.")
+    for name in ('id', 'after'):
+        if not _is_ref(op.get(name)):
+            raise _op_error(index, f'{kind}: {name} має бути числом, рядком або null.')
+
+
+def _validated_block(index: int, values: Dict[str, Any]) -> Dict[str, Any]:
+    from ..serializers import LessonBlockSerializer
+
+    ser = LessonBlockSerializer(data=values)
+    if not ser.is_valid():
+        raise serializers.ValidationError({'ops': {str(index): ser.errors}})
+    return values
+
+
+@transaction.atomic
+def apply_block_ops(lesson: Lesson, base_version: int, ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Застосовує впорядкований список операцій до блоків уроку в одній транзакції.
+
+    ops: {"op": "insert", "temp_id": "t1", "block": {type, data, is_hidden?}, "after": <ref|null>}
+         {"op": "update", "id": <ref>, "block": {type?, data?, is_hidden?}}
+         {"op": "move",   "id": <ref>, "after": <ref|null>}
+         {"op": "delete", "id": <ref>}
+    ref — id блоку (int) або temp_id (str) блоку, вставленого раніше в цьому ж пакеті;
+    "after": null — на початок, без "after" — в кінець.
+
+    Рядок уроку блокується (SELECT ... FOR UPDATE); якщо його version != base_version —
+    StaleLessonVersion (409). Запис — через reconcile_lesson_blocks (≤3 bulk-запити).
+    """
+    for index, op in enumerate(ops):
+        _check_op_shape(index, op)
+
+    current = Lesson.objects.select_for_update().values_list('version', flat=True).get(pk=lesson.pk)
+    if current != base_version:
+        raise StaleLessonVersion(current)
+
+    existing = {b.id: b for b in LessonContent.objects.filter(lesson=lesson).order_by('order', 'id')}
+    items = [
+        {'ref': b.id, 'id': b.id, 'type': b.type, 'data': b.data, 'is_hidden': b.is_hidden}
+        for b in existing.values()
+    ]
+
+    def position(index, ref):
+        for pos, item in enumerate(items):
+            if item['ref'] == ref:
+                return pos
+        raise _op_error(index, f'Блок {ref!r} не знайдено.')
+
+    def insert_at(index, op, item):
+        after = op.get('after', _MISSING)
+        if after is _MISSING:
+            items.append(item)
+        elif after is None:
+            items.insert(0, item)
+        else:
+            items.insert(position(index, after) + 1, item)
+
+    for index, op in enumerate(ops):
+        kind = op['op']
+        if kind == 'insert':
+            temp_id = op.get('temp_id')
+            if not isinstance(temp_id, str) or not temp_id:
+                raise _op_error(index, 'insert: потрібен temp_id (рядок).')
+            if any(item['ref'] == temp_id for item in items):
+                raise _op_error(index, f'insert: temp_id {temp_id!r} вже використано.')
+            block = op.get('block') or {}
+            values = _validated_block(index, {
+                'type': block.get('type'),
+                'data': block.get('data', {}),
+                'is_hidden': block.get('is_hidden', False),
+            })
+            insert_at(index, op, {'ref': temp_id, 'id': None, **values})
+
+        elif kind == 'update':
+            item = items[position(index, op.get('id'))]
+            block = op.get('block') or {}
+            merged = {name: block.get(name, item[name]) for name in ('type', 'data', 'is_hidden')}
+            item.update(_validated_block(index, merged))
+
+        elif kind == 'move':
+            item = items.pop(position(index, op.get('id')))
+            if op.get('after') == item['ref']:
+                raise _op_error(index, 'move: блок не можна поставити після самого себе.')
+            insert_at(index, op, item)
+
+        else:  # delete
+            items.pop(position(index, op.get('id')))
+
+    changes = reconcile_lesson_blocks(lesson, items, existing=existing)
+
+    # bulk_create повертає pk у порядку вставки — зіставляємо з temp_id
+    new_refs = [item['ref'] for item in items if item['id'] is None]
+    id_map = {ref: block.id for ref, block in zip(new_refs, changes.created)}
+    version = current
+    if changes:
+        version = Lesson.objects.values_list('version', flat=True).get(pk=lesson.pk)
+    return {
+        'version': version,
+        'id_map': id_map,
+        'created': len(changes.created),
+        'updated': len(changes.updated),
+        'deleted': len(changes.deleted_ids),
+    }
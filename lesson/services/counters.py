@@ -0,0 +1,49 @@
+# lesson/services/counters.py
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from course.cache import bump_catalog_version_on_commit
+from course.models import Course
+from ..models import Lesson
+
+
+def _lessons_subquery(**filters):
+    return (
+        Lesson.objects
+        .filter(course=OuterRef("pk"), **filters)
+        .order_by()
+        .values("course")
+    )
+
+
+def refresh_course_lesson_counters(course_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Перераховує Course.lessons_count / published_lessons_count / lessons_duration_min
+    одним UPDATE з корельованими підзапитами.
+    course_ids=None — усі курси. Повертає кількість оновлених курсів.
+    """
+    qs = Course.objects.all()
+    if course_ids is not None:
+        ids = {cid for cid in course_ids if cid}
+        if not ids:
+            return 0
+        qs = qs.filter(pk__in=ids)
+
+    total = _lessons_subquery().annotate(n=Count("id")).values("n")
+    published = _lessons_subquery(status=Lesson.Status.PUBLISHED).annotate(n=Count("id")).values("n")
+    duration = _lessons_subquery().annotate(s=Sum("duration_min")).values("s")
+
+    zero = Value(0, output_field=IntegerField())
+    updated = qs.update(
+        lessons_count=Coalesce(Subquery(total, output_field=IntegerField()), zero),
+        published_lessons_count=Coalesce(Subquery(published, output_field=IntegerField()), zero),
+        lessons_duration_min=Coalesce(Subquery(duration, output_field=IntegerField()), zero),
+    )
+    if updated:
+        # update() не шле post_save Course — картки каталогу інвалідуємо самі
+        bump_catalog_version_on_commit()
+    return updated
@@ -0,0 +1,117 @@
+# lesson/services/ordering.py
+"""
+Розріджені ранги для поля order (модулі, уроки, блоки).
+
+Сусідні елементи стоять з кроком RANK_GAP, тож переміщення одного елемента — це новий
+ранг посередині проміжку, тобто запис одного рядка. Рядки, що лишаються на місці, визначає
+найдовша зростаюча підпослідовність поточних рангів у новому порядку: їх не чіпаємо, решті
+даємо ранги між сусідами. Якщо проміжок вичерпано — перенумерація всього скоупу з кроком
+RANK_GAP (bulk_update лише змінених рядків), після чого переміщення знову дешеві.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+RANK_GAP = 1024
+MAX_RANK = 2 ** 31 - 1   # PositiveIntegerField
+
+
+def _stable_indices(ranks: Sequence[Optional[int]]) -> set:
+    """Індекси найдовшої строго зростаючої підпослідовності рангів (None пропускаємо)."""
+    tails: List[int] = []       # tails[k] — мінімальний хвостовий ранг підпослідовності довжини k+1
+    tail_idx: List[int] = []
+    prev: Dict[int, Optional[int]] = {}
+    for i, rank in enumerate(ranks):
+        if rank is None:
+            continue
+        k = bisect_left(tails, rank)
+        prev[i] = tail_idx[k - 1] if k else None
+        if k == len(tails):
+            tails.append(rank)
+            tail_idx.append(i)
+        else:
+            tails[k] = rank
+            tail_idx[k] = i
+    stable = set()
+    i = tail_idx[-1] if tail_idx else None
+    while i is not None:
+        stable.add(i)
+        i = prev[i]
+    return stable
+
+
+def plan_ranks(sequence: Sequence[Tuple[Hashable, Optional[int]]], gap: int = RANK_GAP) -> Dict[Hashable, int]:
+    """
+    sequence — бажаний порядок скоупу: [(ключ, поточний ранг або None для нового елемента)].
+    Повертає {ключ: новий ранг} лише для елементів, ранг яких треба записати.
+    """
+    ranks = [rank for _, rank in sequence]
+    stable = _stable_indices(ranks)
+    planned: Dict[Hashable, int] = {}
+
+    i, n = 0, len(sequence)
+    while i < n:
+        if i in stable:
+            i += 1
+            continue
+        j = i
+        while j < n and j not in stable:
+            j += 1
+        # елементи [i, j) — між стабільними сусідами i-1 та j
+        lo = ranks[i - 1] if i else -1
+        hi = ranks[j] if j < n else None
+        count = j - i
+        if hi is None:
+            new = [max(lo, 0) + gap * (k + 1) for k in range(count)]
+            if new[-1] > MAX_RANK:
+                return _rebalance(sequence, gap)
+        else:
+            step = (hi - lo) // (count + 1)
+            if step < 1:
+                return _rebalance(sequence, gap)
+            new = [lo + step * (k + 1) for k in range(count)]
+        for k, rank in enumerate(new):
+            key, current = sequence[i + k]
+            if rank != current:
+                planned[key] = rank
+        i = j
+    return planned
+
+
+def _rebalance(sequence: Sequence[Tuple[Hashable, Optional[int]]], gap: int) -> Dict[Hashable, int]:
+    return {key: (i + 1) * gap for i, (key, current) in enumerate(sequence) if current != (i + 1) * gap}
+
+
+def rerank(desired: Sequence, gap: int = RANK_GAP) -> list:
+    """Об'єкти скоупу в бажаному порядку → ті з них, кому виставлено новий order (для bulk_update)."""
+    planned = plan_ranks([(i, obj.order) for i, obj in enumerate(desired)], gap)
+    for i, rank in planned.items():
+        desired[i].order = rank
+    return [desired[i] for i in sorted(planned)]
+
+
+def respace(ordered: Sequence, gap: int = RANK_GAP) -> list:
+    """Примусова перенумерація скоупу з кроком gap (адмін-дія); повертає лише змінені об'єкти."""
+    planned = _rebalance([(i, obj.order) for i, obj in enumerate(ordered)], gap)
+    for i, rank in planned.items():
+        ordered[i].order = rank
+    return [ordered[i] for i in sorted(planned)]
+
+
+def apply_positions(current: Sequence, positions: Dict[int, int]) -> list:
+    """
+    Бажаний порядок для старого формату {id: order} від клієнта: надіслані елементи стають
+    на вказані позиції, ненадіслані зберігають свою поточну (1-based) позицію в скоупі.
+    current — об'єкти скоупу в поточному порядку (order, id).
+    """
+    keyed = sorted(
+        (positions.get(obj.id, index), 0 if obj.id in positions else 1, index, obj)
+        for index, obj in enumerate(current, start=1)
+    )
+    return [obj for *_, obj in keyed]
+
+
+def next_rank(last: Optional[int], gap: int = RANK_GAP) -> int:
+    """Ранг для елемента в кінці скоупу, де last — поточний максимальний order (або None)."""
+    return (last or 0) + gap
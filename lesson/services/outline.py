@@ -0,0 +1,107 @@
+# lesson/services/outline.py
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from brainboost.cache_versions import bump_version, get_version
+from course.models import Course
+from ..models import Lesson, LessonProgress, Module
+
+OUTLINE_TIMEOUT = getattr(settings, "LESSON_OUTLINE_CACHE_TIMEOUT", 60 * 60 * 24)
+
+LESSON_FIELDS = ("id", "title", "summary", "duration_min", "cover_image", "order", "module_id")
+
+
+def _namespace(course_id: int) -> str:
+    return f"lesson-outline:{course_id}"
+
+
+def bump_course_outlines(course_ids: Iterable[Optional[int]]) -> None:
+    """Викликається при зміні уроків/модулів курсу — закешована структура стає неактуальною."""
+    for course_id in {cid for cid in course_ids if cid}:
+        bump_version(_namespace(course_id))
+
+
+def course_outline(course_id: int) -> Optional[dict]:
+    """
+    Анонімна структура курсу: видимі модулі → опубліковані уроки (без прогресу).
+    На промаху — один запит модулів і один запит уроків; далі живе в кеші до bump версії курсу.
+    None — курсу немає.
+    """
+    key = f"{_namespace(course_id)}:v{get_version(_namespace(course_id))}"
+    outline = cache.get(key)
+    if outline is not None:
+        return outline
+
+    modules = list(
+        Module.objects
+        .filter(course_id=course_id, is_visible=True)
+        .order_by("order", "id")
+        .values("id", "title", "description", "order")
+    )
+    if not modules and not Course.objects.filter(pk=course_id).exists():
+        return None
+
+    by_module = {m["id"]: {**m, "lessons": []} for m in modules}
+    loose = []
+    storage = Lesson._meta.get_field("cover_image").storage
+    lessons = (
+        Lesson.objects
+        .filter(course_id=course_id, status=Lesson.Status.PUBLISHED)
+        .order_by("order", "id")
+        .values(*LESSON_FIELDS)
+    )
+    for lesson in lessons:
+        lesson["cover_image"] = storage.url(lesson["cover_image"]) if lesson["cover_image"] else None
+        if lesson["module_id"] is None:
+            loose.append(lesson)
+        elif lesson["module_id"] in by_module:
+            by_module[lesson["module_id"]]["lessons"].append(lesson)
+        # урок прихованого модуля у зміст не потрапляє
+
+    outline = {"course": course_id, "modules": list(by_module.values()), "lessons": loose}
+    cache.set(key, outline, OUTLINE_TIMEOUT)
+    return outline
+
+
+def user_outline(course_id: int, user, build_url=None) -> Optional[dict]:
+    """
+    Структура з кешу + прогрес користувача поверх неї (один запит LessonProgress → dict).
+    build_url — напр. request.build_absolute_uri для абсолютних URL обкладинок.
+    """
+    outline = course_outline(course_id)
+    if outline is None:
+        return None
+
+    lesson_ids = [l["id"] for m in outline["modules"] for l in m["lessons"]] + [l["id"] for l in outline["lessons"]]
+    progress = {}
+    if user is not None and user.is_authenticated and lesson_ids:
+        progress = {
+            lesson_id: (state, result_percent)
+            for lesson_id, state, result_percent in LessonProgress.objects.filter(
+                user=user, lesson_id__in=lesson_ids
+            ).values_list("lesson_id", "state", "result_percent")
+        }
+
+    def overlay(lesson):
+        state, result_percent = progress.get(lesson["id"], (None, None))
+        cover = lesson["cover_image"]
+        return {
+            **lesson,
+            "cover_image": build_url(cover) if cover and build_url else cover,
+            "state": state,
+            "completed": state == LessonProgress.State.COMPLETED,
+            "result_percent": result_percent,
+        }
+
+    modules = [{**m, "lessons": [overlay(l) for l in m["lessons"]]} for m in outline["modules"]]
+    return {
+        "course": course_id,
+        "modules": modules,
+        "lessons": [overlay(l) for l in outline["lessons"]],
+        "lessons_total": len(lesson_ids),
+        "lessons_completed": sum(state == LessonProgress.State.COMPLETED for state, _ in progress.values()),
+    }
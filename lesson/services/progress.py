@@ -0,0 +1,180 @@
+# lesson/services/progress.py
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+from django.db import connection, transaction
+from django.db.models import Avg, Count, IntegerField, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from course.models import PurchasedCourse
+from ..models import CourseProgress, Lesson, LessonProgress
+
+_PUBLISHED = Q(lesson__status=Lesson.Status.PUBLISHED)
+
+
+@transaction.atomic
+def refresh_course_progress(course_ids: Optional[Iterable[int]] = None, user_id: Optional[int] = None) -> int:
+    """
+    Перераховує CourseProgress для курсів course_ids (None — усі) і, якщо задано, лише одного користувача.
+
+    Один UPDATE наявних зведених рядків, один агрегат по LessonProgress (GROUP BY user, course)
+    і один UPSERT. lessons_total — кількість опублікованих уроків курсу (корельований підзапит).
+    Повертає кількість записаних рядків.
+    """
+    progress = LessonProgress.objects.all()
+    rollups = CourseProgress.objects.all()
+    if course_ids is not None:
+        ids = {cid for cid in course_ids if cid}
+        if not ids:
+            return 0
+        progress = progress.filter(lesson__course_id__in=ids)
+        rollups = rollups.filter(course_id__in=ids)
+    if user_id is not None:
+        progress = progress.filter(user_id=user_id)
+        rollups = rollups.filter(user_id=user_id)
+
+    def published_total(course_ref):
+        return Coalesce(
+            Subquery(
+                Lesson.objects.filter(course=OuterRef(course_ref), status=Lesson.Status.PUBLISHED)
+                .order_by().values('course').annotate(n=Count('id')).values('n'),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+
+    # спершу «обнуляємо» всі зведені рядки в межах вибірки: пари, у яких прогресу
+    # більше немає (уроки видалили), так і лишаться нульовими; решту перезапише UPSERT
+    rollups.update(lessons_completed=0, avg_result_percent=None, lessons_total=published_total('course'))
+
+    rows = (
+        progress.order_by()
+        .values('user_id', 'lesson__course_id')
+        .annotate(
+            completed=Count('id', filter=_PUBLISHED & Q(state=LessonProgress.State.COMPLETED)),
+            avg_percent=Avg('result_percent', filter=_PUBLISHED),
+            last_activity=Max('updated_at'),
+            total=published_total('lesson__course'),
+        )
+    )
+    objs = [
+        CourseProgress(
+            user_id=r['user_id'],
+            course_id=r['lesson__course_id'],
+            lessons_completed=r['completed'],
+            lessons_total=r['total'],
+            avg_result_percent=r['avg_percent'],
+            last_activity=r['last_activity'],
+        )
+        for r in rows
+    ]
+
+    if objs:
+        CourseProgress.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=['user', 'course'],
+            update_fields=['lessons_completed', 'lessons_total', 'avg_result_percent', 'last_activity', 'updated_at'],
+        )
+    return len(objs)
+
+
+def refresh_user_course_progress(user_id: int, course_id: int) -> int:
+    """Інкрементально для однієї пари після зміни LessonProgress: агрегат по уроках одного курсу."""
+    return refresh_course_progress([course_id], user_id=user_id)
+
+
+def course_completed(user, course_id: int) -> bool:
+    row = CourseProgress.objects.filter(user=user, course_id=course_id).only(
+        'lessons_completed', 'lessons_total'
+    ).first()
+    return bool(row and row.is_completed)
+
+
+# ---------- офлайн-синхронізація ----------
+_UPSERT_COLUMNS = (
+    "user_id", "lesson_id", "state", "result_percent", "started_at", "completed_at", "updated_at", "client_updated_at",
+)
+
+
+def _upsert_progress_sql(n_rows: int) -> str:
+    """
+    INSERT ... ON CONFLICT (user, lesson) DO UPDATE з умовою last-writer-wins:
+    рядок оновлюється, лише якщо подія клієнта не старша за збережену (для рядків,
+    записаних старим ендпоінтом без client_updated_at, порівнюємо з updated_at).
+    RETURNING повертає уроки, де подію застосовано.
+    """
+    qn = connection.ops.quote_name
+    row = "(" + ", ".join(["%s"] * len(_UPSERT_COLUMNS)) + ")"
+    return (
+        f"INSERT INTO {qn(LessonProgress._meta.db_table)} AS t ({', '.join(map(qn, _UPSERT_COLUMNS))}) "
+        f"VALUES {', '.join([row] * n_rows)} "
+        "ON CONFLICT (user_id, lesson_id) DO UPDATE SET "
+        "state = EXCLUDED.state, "
+        "result_percent = COALESCE(EXCLUDED.result_percent, t.result_percent), "
+        "started_at = COALESCE(t.started_at, EXCLUDED.started_at), "
+        "completed_at = COALESCE(EXCLUDED.completed_at, t.completed_at), "
+        "updated_at = EXCLUDED.updated_at, "
+        "client_updated_at = EXCLUDED.client_updated_at "
+        "WHERE COALESCE(t.client_updated_at, t.updated_at) <= EXCLUDED.client_updated_at "
+        "RETURNING t.lesson_id"
+    )
+
+
+@transaction.atomic
+def sync_lesson_progress(user, events: List[dict]) -> Dict[str, list]:
+    """
+    Пакет подій {lesson_id, state, result_percent?, client_ts} одного користувача:
+    один запит уроків, один — доступу до курсів, один UPSERT і один перерахунок CourseProgress.
+    На кожен урок лишається найпізніша подія пакета; час клієнта з майбутнього обрізаємо до now.
+    Повертає {"applied": [...], "stale": [...], "rejected": [{"lesson_id", "detail"}]}.
+    """
+    now = timezone.now()
+    latest: Dict[int, dict] = {}
+    for event in events:
+        current = latest.get(event["lesson_id"])
+        if current is None or event["client_ts"] >= current["client_ts"]:
+            latest[event["lesson_id"]] = event
+
+    courses = dict(Lesson.objects.filter(pk__in=latest).order_by().values_list("id", "course_id"))
+    if user.is_staff or user.is_superuser:
+        allowed = set(courses.values())
+    else:
+        allowed = set(
+            PurchasedCourse.objects.filter(user=user, course_id__in=set(courses.values()), is_active=True)
+            .values_list("course_id", flat=True)
+        )
+
+    rejected, params = [], []
+    for lesson_id, event in latest.items():
+        if lesson_id not in courses:
+            rejected.append({"lesson_id": lesson_id, "detail": "Урок не знайдено."})
+            continue
+        if courses[lesson_id] not in allowed:
+            rejected.append({"lesson_id": lesson_id, "detail": "Немає доступу до курсу."})
+            continue
+        ts = min(event["client_ts"], now)
+        state = event["state"]
+        params.extend([
+            user.id, lesson_id, state, event.get("result_percent"),
+            ts if state == LessonProgress.State.STARTED else None,
+            ts if state == LessonProgress.State.COMPLETED else None,
+            now, ts,
+        ])
+
+    applied: List[int] = []
+    if params:
+        with connection.cursor() as cursor:
+            cursor.execute(_upsert_progress_sql(len(params) // len(_UPSERT_COLUMNS)), params)
+            applied = sorted(row[0] for row in cursor.fetchall())
+    if applied:
+        refresh_course_progress({courses[lesson_id] for lesson_id in applied}, user_id=user.id)
+
+    skipped = {r["lesson_id"] for r in rejected}
+    return {
+        "applied": applied,
+        "stale": sorted(set(latest) - set(applied) - skipped),
+        "rejected": rejected,
+    }
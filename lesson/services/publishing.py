@@ -0,0 +1,61 @@
+# lesson/services/publishing.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Lesson
+from .counters import refresh_course_lesson_counters
+from .outline import bump_course_outlines
+from .progress import refresh_course_progress
+
+
+def refresh_after_status_change(course_ids: Iterable[int]) -> None:
+    """
+    Те, що робили б сигнали Lesson для кожного уроку, — одним проходом на набір курсів:
+    лічильники Course (і версія каталогу), зведений прогрес, зміст курсу.
+    Для queryset.update(), який сигналів не шле.
+    """
+    course_ids = {cid for cid in course_ids if cid}
+    if not course_ids:
+        return
+    refresh_course_lesson_counters(course_ids)
+    refresh_course_progress(course_ids)
+    bump_course_outlines(course_ids)
+
+
+def publish_due_lessons(now: Optional[datetime] = None, batch_size: int = 500) -> int:
+    """
+    Публікує SCHEDULED уроки з scheduled_at <= now, пачка на транзакцію.
+    Рядки беруться з SKIP LOCKED (паралельний воркер чи автор, що саме править урок, не чекаються);
+    кожна пачка — один UPDATE (status, published_at, version) і один перерахунок похідних даних.
+    Повертає кількість опублікованих уроків.
+    """
+    now = now or timezone.now()
+    total = 0
+    while True:
+        with transaction.atomic():
+            due = list(
+                Lesson.objects
+                # частковий індекс lesson_scheduled_idx
+                .filter(status=Lesson.Status.SCHEDULED, scheduled_at__lte=now)
+                .order_by('scheduled_at')
+                .select_for_update(skip_locked=True)
+                .values_list('id', 'course_id')[:batch_size]
+            )
+            if due:
+                Lesson.objects.filter(pk__in=[pk for pk, _ in due]).update(
+                    status=Lesson.Status.PUBLISHED,
+                    published_at=now,
+                    # версія — ключ кешу студентського JSON і ETag
+                    version=F('version') + 1,
+                    updated_at=now,
+                )
+                refresh_after_status_change(course_id for _, course_id in due)
+        total += len(due)
+        if len(due) < batch_size:
+            return total
@@ -0,0 +1,105 @@
+# lesson/services/student_payload.py
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Prefetch
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from ..models import Lesson, LessonContent
+
+STUDENT_PAYLOAD_TIMEOUT = getattr(settings, "LESSON_PAYLOAD_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def bump_lesson_versions(**filters) -> int:
+    """
+    Атомарно збільшує Lesson.version (і updated_at) для уроків за фільтром.
+    Для шляхів, що оминають Lesson.save(): bulk_update, queryset.update, зміни блоків/модуля.
+    """
+    return Lesson.objects.filter(**filters).update(version=F("version") + 1, updated_at=timezone.now())
+
+
+_pending_bumps: ContextVar[Optional[set]] = ContextVar("pending_lesson_bumps", default=None)
+
+
+@contextmanager
+def deferred_lesson_bumps():
+    """
+    Усередині блоку note_lesson_changed() лише збирає id уроків;
+    на виході — один UPDATE замість окремого на кожен видалений/збережений блок.
+    """
+    if _pending_bumps.get() is not None:
+        yield
+        return
+    pending = set()
+    token = _pending_bumps.set(pending)
+    try:
+        yield
+    finally:
+        _pending_bumps.reset(token)
+    if pending:
+        bump_lesson_versions(pk__in=pending)
+
+
+def note_lesson_changed(lesson_id: int) -> None:
+    pending = _pending_bumps.get()
+    if pending is not None:
+        pending.add(lesson_id)
+    else:
+        bump_lesson_versions(pk=lesson_id)
+
+
+def published_lesson_state(lesson_id: int) -> Optional[dict]:
+    """{id, version, updated_at} опублікованого уроку або None — один запит по PK."""
+    return (
+        Lesson.objects.filter(pk=lesson_id, status=Lesson.Status.PUBLISHED)
+        .values("id", "version", "updated_at")
+        .first()
+    )
+
+
+def _payload_key(lesson_id: int, version: int) -> str:
+    return f"lesson:student:{lesson_id}:v{version}"
+
+
+def compile_student_lesson(lesson_id: int, version: int) -> Optional[bytes]:
+    """
+    «Студентський» JSON уроку: LessonSerializer без прихованих блоків (відсіюються в SQL).
+    Серіалізується один раз на версію уроку; будь-яка зміна уроку/блоків/модуля
+    збільшує version, тож старий запис просто перестає читатися.
+    """
+    from ..serializers import LessonSerializer
+
+    body = cache.get(_payload_key(lesson_id, version))
+    if body is not None:
+        return body
+
+    lesson = (
+        Lesson.objects
+        .select_related("module")
+        .prefetch_related(Prefetch("contents", queryset=LessonContent.objects.filter(is_hidden=False)))
+        .filter(pk=lesson_id, status=Lesson.Status.PUBLISHED)
+        .first()
+    )
+    if lesson is None:
+        return None
+    body = JSONRenderer().render(LessonSerializer(lesson).data)
+    # ключ — версія саме завантаженого рядка, а не та, що прийшла ззовні
+    cache.set(_payload_key(lesson.id, lesson.version), body, STUDENT_PAYLOAD_TIMEOUT)
+    return body
+
+
+def student_lesson_data(body: bytes, only, omit):
+    """Для ?fields=/?omit= розбираємо закешований JSON і обрізаємо верхній рівень."""
+    data = json.loads(body)
+    if only is not None:
+        data = {k: v for k, v in data.items() if k in only}
+    for name in omit:
+        data.pop(name, None)
+    return data
@@ -1,15 +1,15 @@
 from django.urls import path
 from .views import (
-    CourseLessonsWithProgressView,
+    CourseLessonsWithProgressView, CourseOutlineView,
     # modules
     ModuleListCreateView, ModuleDetailView, ModuleReorderView, CourseModulesView,
     # lessons
     LessonListCreateView, LessonDetailView, LessonReorderView,
-    LessonBlockListCreateView, LessonBlockDetailView, LessonBlockReorderView,
+    LessonBlockListCreateView, LessonBlockDetailView, LessonBlockReorderView, LessonBlockOpsView,
     LessonPublishView,
     # public & progress
     LessonPublicDetailView, LessonPublicDetailViewById,
-    LessonProgressUpsertView, LessonsByCourseView,
+    LessonProgressUpsertView, LessonProgressSyncView, LessonsByCourseView,
     # legacy theories
     LessonTheoryView, lesson_theory,
 )
@@ -28,6 +28,7 @@ urlpatterns = [
 
     # Blocks (teacher)
     path('admin/lessons/<int:lesson_id>/blocks/', LessonBlockListCreateView.as_view(), name='lesson-blocks'),
+    path('admin/lessons/<int:lesson_id>/blocks/ops/', LessonBlockOpsView.as_view(), name='lesson-blocks-ops'),
     path('admin/lessons/<int:lesson_id>/blocks/reorder/', LessonBlockReorderView.as_view(), name='lesson-blocks-reorder'),
     path('admin/lessons/<int:lesson_id>/blocks/<int:block_id>/', LessonBlockDetailView.as_view(), name='lesson-block-detail'),
 
@@ -36,9 +37,11 @@ urlpatterns = [
     path('public/lessons/id/<int:lesson_id>/', LessonPublicDetailViewById.as_view(), name='lesson-public-detail-id'),
     path('courses/<int:course_id>/lessons/', CourseLessonsWithProgressView.as_view(), name='course-lessons'),
      path('courses/<int:course_id>/modules/', CourseModulesView.as_view(), name='course-modules'),  # 👈 новий
+    path('courses/<int:course_id>/outline/', CourseOutlineView.as_view(), name='course-outline'),
 
     # -------- Progress
     path('progress/<int:lesson_id>/', LessonProgressUpsertView.as_view(), name='lesson-progress-upsert'),
+    path('progress/sync/', LessonProgressSyncView.as_view(), name='lesson-progress-sync'),
 
     # -------- Legacy/compat «theories»
     path('lesson/theories/<int:lesson_id>/', LessonTheoryView.as_view(), name='lesson-theory-list'),
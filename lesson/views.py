@@ -3,6 +3,7 @@ from typing import Optional
 
 from django.db import transaction, models
 from django.db.models import Exists, OuterRef, Subquery, Q, Value, BooleanField, IntegerField
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework.permissions import IsAuthenticated
@@ -18,10 +19,19 @@ from course.models import Course
 from .models import Module, Lesson, LessonContent, LessonProgress
 from .serializers import (
     ModuleSerializer, ModuleReorderSerializer,
-    LessonSerializer, LessonBlockSerializer,
-    LessonProgressSerializer, LessonPublicListWithProgressSerializer,
+    LessonSerializer, LessonBlockSerializer, LessonBlockOpsSerializer,
+    LessonProgressSerializer, LessonProgressSyncSerializer, LessonPublicListWithProgressSerializer,
 )
 from .permissions import HasCourseAccess, IsCourseAuthorOrStaff
+from brainboost.fieldsets import SparseQuerysetMixin, requested_fieldset
+from brainboost.conditional import ConditionalGetMixin, Validators, make_etag
+from .services.blocks import apply_block_ops
+from .services.ordering import apply_positions, next_rank, rerank
+from .services.outline import bump_course_outlines, user_outline
+from .services.progress import refresh_user_course_progress, sync_lesson_progress
+from .services.student_payload import (
+    bump_lesson_versions, compile_student_lesson, published_lesson_state, student_lesson_data,
+)
 
 
 # -------- helper for object-level permission --------
@@ -34,6 +44,14 @@ def _get_course_from_obj(obj) -> Optional[Course]:
         return obj.lesson.course
     return None
 
+def _may_edit_all_courses(request, view, objs) -> bool:
+    """Перевірка прав на кожен курс пакета (по одному об'єкту на курс), а не лише на курс першого елемента."""
+    perm = IsCourseAuthorOrStaff()
+    first_per_course = {}
+    for obj in objs:
+        first_per_course.setdefault(obj.course_id, obj)
+    return all(perm.has_object_permission(request, view, obj) for obj in first_per_course.values())
+
 # --- новий список модулів курсу ---
 class CourseModulesView(ListAPIView):
     """
@@ -52,6 +70,21 @@ class CourseModulesView(ListAPIView):
             .order_by("order", "id")
         )
 
+class CourseOutlineView(APIView):
+    """
+    GET /api/lesson/courses/<course_id>/outline/
+    Зміст курсу одним запитом: модулі → опубліковані уроки (+ уроки без модуля в "lessons")
+    зі станом прогресу користувача. Структура кешується на версію курсу, прогрес — поверх неї.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request, course_id: int):
+        data = user_outline(course_id, request.user, build_url=request.build_absolute_uri)
+        if data is None:
+            raise Http404
+        return Response(data)
+
+
 # ============================ MODULES (teacher) ============================
 class ModuleListCreateView(generics.ListCreateAPIView):
     serializer_class = ModuleSerializer
@@ -97,19 +130,25 @@ class ModuleReorderView(APIView):
         modules = list(Module.objects.filter(id__in=ids).select_related('course'))
         if not modules:
             return Response(status=204)
-        if not IsCourseAuthorOrStaff().has_object_permission(request, self, modules[0]):
+        # rerank переписує порядок у кожному зачепленому курсі — права потрібні на всі
+        if not _may_edit_all_courses(request, self, modules):
             return Response({"detail":"Немає прав."}, status=403)
-        m_map = {m.id: m for m in modules}
-        for it in items:
-            m = m_map.get(it['id'])
-            if m:
-                m.order = it['order']
-        Module.objects.bulk_update(modules, ['order'])
-        return Response({"updated": len(modules)}, status=200)
+        positions = {it['id']: it['order'] for it in items}
+        # скоуп — усі модулі зачеплених курсів; пишемо лише рядки, яким справді потрібен новий ранг
+        by_course = {}
+        for m in Module.objects.filter(course_id__in={m.course_id for m in modules}).order_by('order', 'id'):
+            by_course.setdefault(m.course_id, []).append(m)
+        changed = [m for scope in by_course.values() for m in rerank(apply_positions(scope, positions))]
+        if changed:
+            Module.objects.bulk_update(changed, ['order'])
+            # порядок модуля вбудований у відповідь уроку
+            bump_lesson_versions(module_id__in=[m.id for m in changed])
+            bump_course_outlines(m.course_id for m in changed)
+        return Response({"updated": len(changed)}, status=200)
 
 
 # ============================ LESSONS (teacher) ============================
-class LessonListCreateView(generics.ListCreateAPIView):
+class LessonListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     GET:   ?course=&module=&ordering=
     POST:  створення уроку (і через contents[], і через старий плоский формат).
@@ -155,7 +194,7 @@ class LessonListCreateView(generics.ListCreateAPIView):
     # --- /FIX ---
 
 
-class LessonDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LessonDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     GET/PATCH/DELETE /admin/lessons/<pk>/
     PATCH приймає як плоскі поля (title, summary, ...) так і contents[]/module(_id)
@@ -183,15 +222,25 @@ class LessonReorderView(APIView):
         lessons = list(Lesson.objects.filter(id__in=[i['id'] for i in items]).select_related('course'))
         if not lessons:
             return Response(status=204)
-        if not IsCourseAuthorOrStaff().has_object_permission(request, self, lessons[0]):
+        if not _may_edit_all_courses(request, self, lessons):
             return Response({"detail":"Немає прав."}, status=403)
-        lmap = {l.id: l for l in lessons}
-        for it in items:
-            l = lmap.get(it['id'])
-            if l:
-                l.order = it['order']
-        Lesson.objects.bulk_update(lessons, ['order'])
-        return Response({"updated": len(lessons)}, status=200)
+        positions = {it['id']: it['order'] for it in items}
+        # скоуп порядку — модуль (або уроки курсу без модуля)
+        scopes = {(l.course_id, l.module_id) for l in lessons}
+        by_scope = {}
+        for l in (
+            Lesson.objects.filter(course_id__in={c for c, _ in scopes})
+            .only('id', 'course_id', 'module_id', 'order').order_by('order', 'id')
+        ):
+            if (l.course_id, l.module_id) in scopes:
+                by_scope.setdefault((l.course_id, l.module_id), []).append(l)
+        changed = [l for scope in by_scope.values() for l in rerank(apply_positions(scope, positions))]
+        if changed:
+            Lesson.objects.bulk_update(changed, ['order'])
+            # bulk_update оминає Lesson.save() — версію (кеш/ETag) піднімаємо явно
+            bump_lesson_versions(pk__in=[l.id for l in changed])
+            bump_course_outlines(l.course_id for l in changed)
+        return Response({"updated": len(changed)}, status=200)
 
 
 # ----- BLOCKS (для редактора) -----
@@ -252,6 +301,27 @@ class LessonBlockDetailView(APIView):
         return Response(status=204)
 
 
+class LessonBlockOpsView(APIView):
+    """
+    POST /admin/lessons/<lesson_id>/blocks/ops/
+    {"base_version": N, "ops": [...]} — пакет insert/update/move/delete від автозбереження.
+    409, якщо урок уже має іншу версію; у відповіді — нова version і temp_id → id.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsCourseAuthorOrStaff]
+
+    def get_course(self, obj):
+        return _get_course_from_obj(obj)
+
+    def post(self, request, lesson_id: int):
+        lesson = get_object_or_404(Lesson.objects.select_related('course'), pk=lesson_id)
+        if not IsCourseAuthorOrStaff().has_object_permission(request, self, lesson):
+            return Response({"detail":"Немає прав."}, status=403)
+        ser = LessonBlockOpsSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        result = apply_block_ops(lesson, ser.validated_data['base_version'], ser.validated_data['ops'])
+        return Response(result, status=200)
+
+
 class LessonBlockReorderView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsCourseAuthorOrStaff]
 
@@ -266,14 +336,16 @@ class LessonBlockReorderView(APIView):
         items = request.data.get('items', [])
         if not items:
             return Response(status=204)
-        blocks = list(LessonContent.objects.filter(id__in=[i['id'] for i in items], lesson=lesson))
-        bmap = {b.id: b for b in blocks}
-        for it in items:
-            b = bmap.get(it['id'])
-            if b:
-                b.order = it['order']
-        LessonContent.objects.bulk_update(blocks, ['order'])
-        return Response({"updated": len(blocks)}, status=200)
+        positions = {it['id']: it['order'] for it in items}
+        blocks = list(LessonContent.objects.filter(lesson=lesson).only('id', 'order').order_by('order', 'id'))
+        changed = rerank(apply_positions(blocks, positions))
+        if changed:
+            now = timezone.now()
+            for b in changed:
+                b.updated_at = now
+            LessonContent.objects.bulk_update(changed, ['order', 'updated_at'])
+            bump_lesson_versions(pk=lesson.pk)
+        return Response({"updated": len(changed)}, status=200)
 
 
 # ============================ PUBLISH / PROGRESS ============================
@@ -370,47 +442,74 @@ class LessonProgressUpsertView(APIView):
         if state == LessonProgress.State.COMPLETED:
             lp.completed_at = now
         lp.result_percent = rp
-        lp.save(update_fields=['state', 'result_percent', 'started_at', 'completed_at', 'updated_at'])
+        lp.client_updated_at = now
+        lp.save(update_fields=['state', 'result_percent', 'started_at', 'completed_at', 'updated_at', 'client_updated_at'])
+        # зведений прогрес курсу — лише для цієї пари (user, course)
+        refresh_user_course_progress(user.id, lesson.course_id)
 
         return Response(LessonProgressSerializer(lp).data, status=200)
 
 
 # ============================ PUBLIC (student) ============================
-class LessonPublicDetailView(APIView):
-    """GET /public/lessons/<id>/ — тільки PUBLISHED + без прихованих блоків."""
-    permission_classes = [IsAuthenticatedOrReadOnly, HasCourseAccess]
+class LessonProgressSyncView(APIView):
+    """
+    POST /progress/sync/ — пакет подій прогресу (офлайн-клієнти):
+    {"events": [{"lesson_id", "state", "result_percent", "client_ts"}, ...]}.
+    Перемагає пізніша подія за client_ts; уроки без доступу повертаються в "rejected".
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        ser = LessonProgressSyncSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        return Response(sync_lesson_progress(request.user, ser.validated_data['events']), status=200)
+
+
+class StudentLessonMixin(ConditionalGetMixin):
+    """
+    Публічна деталь уроку: валідатори — з Lesson.version, тіло — скомпільований
+    студентський JSON з кешу (lesson/services/student_payload.py).
+    """
+    lesson_url_kwarg = 'id'
 
     def get_course(self, obj):
         return _get_course_from_obj(obj)
 
-    def get(self, request, id: int):
-        lesson = get_object_or_404(
-            Lesson.objects.select_related('course', 'module').prefetch_related('contents'),
-            id=id, status=Lesson.Status.PUBLISHED
-        )
-        data = LessonSerializer(lesson).data
-        data['contents'] = [c for c in data.get('contents', []) if not c.get('is_hidden')]
-        return Response(data, status=200)
+    def get_lesson_state(self):
+        if not hasattr(self, '_lesson_state'):
+            self._lesson_state = published_lesson_state(self.kwargs[self.lesson_url_kwarg])
+        return self._lesson_state
+
+    def get_validators(self, request, *args, **kwargs):
+        state = self.get_lesson_state()
+        if state is None:
+            return None
+        return Validators(make_etag((state['id'], state['version'])), state['updated_at'])
+
+    def retrieve(self, request, *args, **kwargs):
+        state = self.get_lesson_state()
+        body = compile_student_lesson(state['id'], state['version']) if state else None
+        if body is None:
+            raise Http404
+        only, omit = requested_fieldset(request)
+        if only is None and not omit:
+            return HttpResponse(body, content_type='application/json')
+        return Response(student_lesson_data(body, only, omit), status=200)
+
+
+class LessonPublicDetailView(StudentLessonMixin, APIView):
+    """GET /public/lessons/<id>/ — тільки PUBLISHED + без прихованих блоків."""
+    permission_classes = [IsAuthenticatedOrReadOnly, HasCourseAccess]
+    lesson_url_kwarg = 'id'
 
 
-class LessonPublicDetailViewById(APIView):
+class LessonPublicDetailViewById(StudentLessonMixin, APIView):
     """GET /public/lessons/id/<lesson_id>/ — той самий доступ, просто інший шлях."""
     permission_classes = [IsAuthenticatedOrReadOnly, HasCourseAccess]
-
-    def get_course(self, obj):
-        return _get_course_from_obj(obj)
-
-    def get(self, request, lesson_id: int):
-        lesson = get_object_or_404(
-            Lesson.objects.select_related('course', 'module').prefetch_related('contents'),
-            pk=lesson_id, status=Lesson.Status.PUBLISHED
-        )
-        data = LessonSerializer(lesson).data
-        data['contents'] = [c for c in data.get('contents', []) if not c.get('is_hidden')]
-        return Response(data, status=200)
+    lesson_url_kwarg = 'lesson_id'
 
 
-class LessonsByCourseView(ListAPIView):
+class LessonsByCourseView(SparseQuerysetMixin, ListAPIView):
     """Список опублікованих уроків курсу + прогрес користувача (якщо є)."""
     serializer_class = LessonPublicListWithProgressSerializer
     permission_classes = [AllowAny]
@@ -464,7 +563,8 @@ class LessonTheoryView(APIView):
         txt = request.data.get("text") or request.data.get("theory_text") or ""
         if not txt:
             return Response({"detail": "Empty theory"}, status=400)
-        block = LessonContent.objects.create(lesson=lesson, type='text', data={"html": txt}, order=lesson.contents.count())
+        last = lesson.contents.aggregate(mx=models.Max('order'))['mx']
+        block = LessonContent.objects.create(lesson=lesson, type='text', data={"html": txt}, order=next_rank(last))
         return Response({"id": block.id, "text": txt}, status=201)
 
     @transaction.atomic
@@ -497,7 +597,7 @@ def lesson_theory(request, lesson_id):
 
 
 # === Public list with user progress (для сторінки курсу) ===
-class CourseLessonsWithProgressView(ListAPIView):
+class CourseLessonsWithProgressView(SparseQuerysetMixin, ListAPIView):
     """
     GET /api/lesson/courses/<course_id>/lessons/
     Видає список уроків курсу з анотаціями прогресу й одразу підтягує module.
@@ -122,3 +122,10 @@ def update_course_rating_on_delete(sender, instance: Review, **kwargs):
         _recalc_course_rating(instance.course)
     except Exception:
         pass
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_catalog_cache_on_review_change(sender, **kwargs):
+    from course.cache import bump_catalog_version_on_commit
+    bump_catalog_version_on_commit()
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.db.models import Q
 from .models import Review, ReviewImage
+from brainboost.fieldsets import SparseFieldsetMixin
 
 class ReviewImageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,7 +9,7 @@ class ReviewImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image']
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Публічне відображення (approved)."""
     user_name = serializers.CharField(source='user_name_snapshot', read_only=True)
     user_avatar = serializers.CharField(source='user_avatar_snapshot', read_only=True)
@@ -23,7 +24,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         ]
 
 
-class MyReviewSerializer(serializers.ModelSerializer):
+class MyReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Для /mine — показує також статус модерації."""
     user_name = serializers.CharField(source='user_name_snapshot', read_only=True)
     user_avatar = serializers.CharField(source='user_avatar_snapshot', read_only=True)
@@ -84,7 +85,7 @@ class ReviewModerationSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ReviewAdminSerializer(serializers.ModelSerializer):
+class ReviewAdminSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source='user_name_snapshot', read_only=True)
     user_avatar = serializers.CharField(source='user_avatar_snapshot', read_only=True)
     images = ReviewImageSerializer(many=True, read_only=True)
@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.db.models import Count, Avg
 from .models import Review
+from brainboost.fieldsets import SparseQuerysetMixin
 from .serializers import (
     ReviewSerializer,
     ReviewCreateSerializer,
@@ -11,7 +12,7 @@ from .serializers import (
     ReviewAdminSerializer
 )
 
-class ReviewListAPIView(generics.ListAPIView):
+class ReviewListAPIView(SparseQuerysetMixin, generics.ListAPIView):
     """
     Публічний список СХВАЛЕНИХ відгуків.
     GET /api/reviews/?course=<id>
@@ -19,6 +20,7 @@ class ReviewListAPIView(generics.ListAPIView):
     serializer_class = ReviewSerializer
     filter_backends = [filters.OrderingFilter]
     ordering = ['-created_at']
+    cursor_ordering = ('-created_at', 'id')
 
     def get_queryset(self):
         qs = Review.objects.filter(status=Review.Status.APPROVED)
@@ -42,7 +44,7 @@ class ReviewCreateAPIView(generics.CreateAPIView):
         return ctx
 
 
-class MyReviewsAPIView(generics.ListAPIView):
+class MyReviewsAPIView(SparseQuerysetMixin, generics.ListAPIView):
     """
     Список власних відгуків з їхнім статусом.
     GET /api/reviews/mine/
@@ -51,6 +53,7 @@ class MyReviewsAPIView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.OrderingFilter]
     ordering = ['-created_at']
+    cursor_ordering = ('-created_at', 'id')
 
     def get_queryset(self):
         return Review.objects.filter(user=self.request.user)
@@ -95,7 +98,7 @@ class ReviewSummaryAPIView(APIView):
 class IsAdmin(permissions.IsAdminUser):
     pass
 
-class ReviewAdminListAPIView(generics.ListAPIView):
+class ReviewAdminListAPIView(SparseQuerysetMixin, generics.ListAPIView):
     """
     Адмінський список усіх відгуків (з фільтрами).
     GET /api/reviews/admin/?status=pending|approved|rejected|all&course=<id>
@@ -104,6 +107,7 @@ class ReviewAdminListAPIView(generics.ListAPIView):
     permission_classes = [IsAdmin]
     filter_backends = [filters.OrderingFilter]
     ordering = ["-created_at"]
+    cursor_ordering = ("-created_at", "id")
 
     def get_queryset(self):
         qs = Review.objects.all()
@@ -115,7 +119,7 @@ class ReviewAdminListAPIView(generics.ListAPIView):
             qs = qs.filter(course_id=course_id)
         return qs
 
-class ReviewPendingListAPIView(generics.ListAPIView):
+class ReviewPendingListAPIView(SparseQuerysetMixin, generics.ListAPIView):
     """
     Резервний ендпоінт: тільки pending.
     GET /api/reviews/pending/?course=<id>
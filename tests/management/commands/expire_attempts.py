@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tests.services.attempts import expire_attempts
+
+
+class Command(BaseCommand):
+    help = 'Finalize STARTED test attempts past their time limit (stored answers are graded)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep sweeping every --interval seconds (run as a separate process).')
+        parser.add_argument('--interval', type=int, default=60,
+                            help='Seconds between sweeps in --loop mode (default 60).')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Attempts finalized per transaction (default 500).')
+
+    def handle(self, *args, **options):
+        batch = max(1, options['batch_size'])
+        if not options['loop']:
+            n = expire_attempts(batch_size=batch)
+            self.stdout.write(self.style.SUCCESS(f'Finalized attempts: {n}'))
+            return
+
+        interval = max(1, options['interval'])
+        try:
+            while True:
+                n = expire_attempts(batch_size=batch)
+                if n:
+                    self.stdout.write(f'Finalized attempts: {n}')
+                close_old_connections()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
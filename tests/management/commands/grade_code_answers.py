@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from tests.services.code_runner import WORKERS, grade_pending_code_answers, sandbox_available
+
+
+class Command(BaseCommand):
+    help = ('Auto-grade pending CODE answers in the sandbox (CODE_GRADER_JAIL). Run it as a separate process '
+            'under a dedicated unprivileged user that cannot read the project settings or secrets. '
+            'Each process grades up to --workers attempts at once; for more throughput start several '
+            'processes (on one or more hosts): they share the queue via SELECT ... SKIP LOCKED.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep sweeping every --interval seconds (run as a separate process).')
+        parser.add_argument('--interval', type=int, default=2,
+                            help='Seconds between sweeps in --loop mode (default 2).')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Attempts graded per sweep (default 50).')
+        parser.add_argument('--workers', type=int, default=WORKERS,
+                            help=f'Attempts graded concurrently, one jail each (default CODE_GRADER_WORKERS={WORKERS}).')
+
+    def handle(self, *args, **options):
+        if not sandbox_available():
+            raise CommandError('No sandbox: install bubblewrap or set CODE_GRADER_JAIL. '
+                               'Code answers stay in the manual grading queue.')
+        batch = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+        if not options['loop']:
+            n = grade_pending_code_answers(batch_size=batch, workers=workers)
+            self.stdout.write(self.style.SUCCESS(f'Auto-graded answers: {n}'))
+            return
+
+        interval = max(1, options['interval'])
+        try:
+            while True:
+                n = grade_pending_code_answers(batch_size=batch, workers=workers)
+                if n:
+                    self.stdout.write(f'Auto-graded answers: {n}')
+                close_old_connections()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
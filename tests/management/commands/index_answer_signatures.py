@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from tests.services.similarity import backfill_signatures
+
+
+class Command(BaseCommand):
+    help = 'Sign finished long/code answers that have no MinHash signature yet (near-duplicate detection)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--question', type=int, default=None,
+                            help='Only answers to this question.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Answers signed per transaction (default 500).')
+
+    def handle(self, *args, **options):
+        n = backfill_signatures(question_id=options['question'], batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'Signed answers: {n}'))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0003_test_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answerattempt',
+            index=models.Index(fields=['needs_manual', 'question'], name='tests_answe_needs_m_7f87c3_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0004_answerattempt_manual_queue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minhash', models.BinaryField()),
+                ('answer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='signature', to='tests.answerattempt')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_signatures', to='tests.question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AnswerSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tests.question')),
+                ('signature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='tests.answersignature')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['question', 'bucket'], name='tests_answe_questio_8fcdd3_idx')],
+            },
+        ),
+    ]
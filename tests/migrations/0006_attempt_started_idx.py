@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0005_answer_signatures'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(condition=models.Q(('status', 'started')), fields=['status', 'started_at'], name='attempt_started_idx'),
+        ),
+    ]
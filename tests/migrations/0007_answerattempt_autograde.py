@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0006_attempt_started_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answerattempt',
+            name='autograde',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -1,9 +1,13 @@
 from django.db import models
 from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from brainboost.deletion import first_for_origin, refresh_on_delete
+from brainboost.versioning import VersionedModelMixin
 from lesson.models import Lesson
 
 
-class Test(models.Model):
+class Test(VersionedModelMixin, models.Model):
     class Status(models.TextChoices):
         DRAFT = 'draft', 'Draft'
         PUBLISHED = 'published', 'Published'
@@ -25,6 +29,8 @@ class Test(models.Model):
 
     created_at          = models.DateTimeField(auto_now_add=True)
     updated_at          = models.DateTimeField(auto_now=True)
+    # grows on any change to the test, its questions or choices: cache key of the compiled answer key
+    version             = models.PositiveIntegerField(default=1, editable=False)
 
     class Meta:
         ordering = ['-created_at']
@@ -110,6 +116,9 @@ class TestAttempt(models.Model):
         indexes = [
             models.Index(fields=['user', 'test']),
             models.Index(fields=['test', 'status']),
+            # expiry sweeper: only in-progress attempts, oldest first (tests/services/attempts.py)
+            models.Index(fields=['status', 'started_at'], name='attempt_started_idx',
+                         condition=models.Q(status='started')),
         ]
         unique_together = [('test', 'user', 'attempt_no')]
 
@@ -128,6 +137,7 @@ class AnswerAttempt(models.Model):
     # For short/long/code/match/order:
     free_text        = models.TextField(blank=True)
     free_json        = models.JSONField(default=dict, blank=True)
+    autograde        = models.JSONField(null=True, blank=True)   # code runner report; NULL = not run yet
 
     is_correct       = models.BooleanField(null=True, blank=True)
     score_awarded    = models.DecimalField(max_digits=7, decimal_places=2, default=0)
@@ -140,4 +150,53 @@ class AnswerAttempt(models.Model):
         indexes = [
             models.Index(fields=['attempt', 'question']),
             models.Index(fields=['question']),
+            models.Index(fields=['needs_manual', 'question']),   # manual grading queue
         ]
+
+
+
+class AnswerSignature(models.Model):
+    """MinHash signature of a long/code answer (tests/services/similarity.py)."""
+    answer    = models.OneToOneField(AnswerAttempt, on_delete=models.CASCADE, related_name='signature')
+    question  = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answer_signatures')
+    minhash   = models.BinaryField()   # NUM_PERM x uint32
+
+
+class AnswerSignatureBand(models.Model):
+    """LSH bucket of one signature band: answers sharing a bucket are near-duplicate candidates."""
+    signature = models.ForeignKey(AnswerSignature, on_delete=models.CASCADE, related_name='bands')
+    question  = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='+')
+    bucket    = models.BigIntegerField()   # hash(band no, band values)
+
+    class Meta:
+        indexes = [models.Index(fields=['question', 'bucket'])]
+
+# ---------- answer key invalidation (tests/services/grading.py) ----------
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def bump_test_version_on_question_change(sender, instance: Question, raw=False, origin=None, **kwargs):
+    # on cascade deletes (test/lesson/course) the test goes too; one bump per test per delete()
+    if raw or not refresh_on_delete(origin, Question, ('test', instance.test_id)):
+        return
+    from .services.grading import note_test_changed
+    note_test_changed(test_id=instance.test_id)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def bump_test_version_on_choice_change(sender, instance: Choice, raw=False, origin=None, **kwargs):
+    # choices deleted with their question are covered by the question's own receiver
+    if raw or not refresh_on_delete(origin, Choice, ('question', instance.question_id)):
+        return
+    from .services.grading import note_test_changed
+    note_test_changed(question_id=instance.question_id)
+
+
+# ---------- similarity clusters invalidation (tests/services/similarity.py) ----------
+@receiver(post_delete, sender=AnswerSignature)
+def bump_clusters_on_signature_delete(sender, instance: AnswerSignature, origin=None, **kwargs):
+    # deleted attempts/users take their signatures along; one bump per question per delete()
+    if not first_for_origin(origin, ('clusters', instance.question_id)):
+        return
+    from .services.similarity import bump_question_clusters
+    bump_question_clusters([instance.question_id])
@@ -1,6 +1,8 @@
 from typing import List, Dict, Any
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 from .models import Test, Question, Choice, TestAttempt, AnswerAttempt
+from .services.builder import save_question_tree
 
 
 # ---------- Choice ----------
@@ -36,58 +38,14 @@ class QuestionSerializer(serializers.ModelSerializer):
         ]
 
     def create(self, validated_data):
-        choices_data = validated_data.pop('choices', [])
-        q = Question.objects.create(**validated_data)
-
-        # Short/Long — keep single "etalon" choice as correct (for uniform FE DTO)
-        if q.type in ['short', 'long'] and choices_data:
-            Choice.objects.create(
-                question=q, text=choices_data[0].get('text', ''), is_correct=True, order=1
-            )
-        else:
-            for c in choices_data:
-                Choice.objects.create(question=q, **c)
+        # test comes from serializer.save(test=...)
+        test = validated_data.pop('test')
+        q, = save_question_tree(test.pk, [validated_data], existing={}, etalon_for_new=True)
         return q
 
     def update(self, instance, validated_data):
-        choices_data = validated_data.pop('choices', None)
-
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        if choices_data is not None:
-            if instance.type in ['short', 'long']:
-                # single etalon
-                if choices_data:
-                    etalon = instance.choices.filter(is_correct=True).first()
-                    text_val = choices_data[0].get('text', '')
-                    if etalon:
-                        etalon.text = text_val
-                        etalon.order = 1
-                        etalon.is_correct = True
-                        etalon.save()
-                    else:
-                        Choice.objects.create(
-                            question=instance, text=text_val, is_correct=True, order=1
-                        )
-                # drop others
-                instance.choices.exclude(is_correct=True).delete()
-            else:
-                keep_ids = []
-                for cd in choices_data:
-                    cid = cd.get('id')
-                    if cid:
-                        ch = Choice.objects.get(id=cid, question=instance)
-                        for a, v in cd.items():
-                            setattr(ch, a, v)
-                        ch.save()
-                        keep_ids.append(ch.id)
-                    else:
-                        ch = Choice.objects.create(question=instance, **cd)
-                        keep_ids.append(ch.id)
-                Choice.objects.filter(question=instance).exclude(id__in=keep_ids).delete()
-
+        # one question: its own row + choices in bulk (see tests/services/builder.py)
+        save_question_tree(instance.test_id, [{**validated_data, 'id': instance.id}], existing={instance.id: instance})
         return instance
 
 
@@ -110,14 +68,15 @@ class TestSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         questions_data = validated_data.pop('questions', [])
         test = Test.objects.create(**validated_data)
-        # keep order from payload
-        for qd in questions_data:
-            choices = qd.pop('choices', [])
-            q = Question.objects.create(test=test, **qd)
-            for cd in choices:
-                Choice.objects.create(question=q, **cd)
+        # keep order from payload; whole tree in bulk
+        save_question_tree(test.pk, questions_data, existing={})
         return test
 
+    def to_representation(self, instance):
+        # nested questions + choices in two queries, not one per question (no-op if already prefetched)
+        prefetch_related_objects([instance], 'questions__choices')
+        return super().to_representation(instance)
+
     def update(self, instance, validated_data):
         questions_data = validated_data.pop('questions', None)
 
@@ -126,23 +85,8 @@ class TestSerializer(serializers.ModelSerializer):
         instance.save()
 
         if questions_data is not None:
-            keep_ids = []
-            # Reuse the QuestionSerializer.update for nested updates
-            qser = QuestionSerializer()
-            for qd in questions_data:
-                qid = qd.get('id')
-                if qid:
-                    q = Question.objects.get(id=qid, test=instance)
-                    qser.update(q, qd)
-                    keep_ids.append(q.id)
-                else:
-                    choices = qd.pop('choices', [])
-                    q = Question.objects.create(test=instance, **qd)
-                    for cd in choices:
-                        Choice.objects.create(question=q, **cd)
-                    keep_ids.append(q.id)
-
-            Question.objects.filter(test=instance).exclude(id__in=keep_ids).delete()
+            # matched by id: updated / created / missing ones deleted, choices likewise
+            save_question_tree(instance.pk, questions_data, delete_missing=True)
 
         return instance
 
@@ -156,11 +100,12 @@ class AnswerAttemptReadSerializer(serializers.ModelSerializer):
         model = AnswerAttempt
         fields = [
             'question', 'is_correct', 'score_awarded', 'selected_option_ids',
-            'free_text', 'free_json', 'answered_at', 'needs_manual'
+            'free_text', 'free_json', 'autograde', 'answered_at', 'needs_manual'
         ]
 
     def get_selected_option_ids(self, obj: AnswerAttempt) -> List[int]:
-        return list(obj.selected_options.values_list('id', flat=True))
+        # .all() reuses prefetch_related('answers__selected_options') when the caller did it
+        return [c.id for c in obj.selected_options.all()]
 
 
 class TestAttemptSerializer(serializers.ModelSerializer):
@@ -179,8 +124,41 @@ class TestAttemptSerializer(serializers.ModelSerializer):
 
 
 class TestAttemptDetailSerializer(TestAttemptSerializer):
-    """Full attempt (teacher or after_close)"""
+    """
+    Full attempt (teacher or after_close).
+    Query with prefetch_related('answers__selected_options') to keep it at a fixed number of queries.
+    """
     answers = AnswerAttemptReadSerializer(many=True, read_only=True)
 
     class Meta(TestAttemptSerializer.Meta):
         fields = TestAttemptSerializer.Meta.fields + ['answers']
+
+
+# ---------- Manual grading ----------
+
+class GradingQueueItemSerializer(serializers.ModelSerializer):
+    question_type = serializers.CharField(source='question.type', read_only=True)
+    points = serializers.DecimalField(source='question.points', max_digits=5, decimal_places=2, read_only=True)
+    similar_answers = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AnswerAttempt
+        fields = [
+            'id', 'attempt', 'question', 'question_type', 'points',
+            'free_text', 'free_json', 'autograde', 'answered_at', 'score_awarded', 'is_correct',
+            'similar_answers'
+        ]
+
+    def get_similar_answers(self, obj: AnswerAttempt) -> List[int]:
+        # near-duplicates from the same cluster; the view puts the page's map into context
+        return self.context.get('similar_answers', {}).get(obj.id, [])
+
+
+class ManualGradeSerializer(serializers.Serializer):
+    answer = serializers.IntegerField()
+    score = serializers.DecimalField(max_digits=7, decimal_places=2, min_value=0)
+    is_correct = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+
+class ManualGradeBatchSerializer(serializers.Serializer):
+    grades = ManualGradeSerializer(many=True, allow_empty=False, max_length=500)
@@ -0,0 +1,237 @@
+# tests/services/analytics.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from brainboost.cache_versions import bump_version, get_version
+
+from ..models import AnswerAttempt, Test, TestAttempt
+from .grading import CHOICE_TYPES, AnswerKey, get_answer_key
+
+ITEM_ANALYSIS_TIMEOUT = getattr(settings, "ITEM_ANALYSIS_CACHE_TIMEOUT", 60 * 60 * 24 * 7)
+MERGE_LOCK_TIMEOUT = 30   # seconds; a crashed merge must not block recording forever
+
+FINISHED_STATUSES = (TestAttempt.Status.SUBMITTED, TestAttempt.Status.GRADED)
+
+
+# ---------- Score matrix ----------
+
+@dataclass
+class ItemMatrix:
+    """
+    Finished attempts × questions of one test version.
+    scores — awarded points; answered / pending — masks; selected — attempts × choices (0/1).
+    Rows are keyed by attempt id, so a re-graded attempt replaces its row instead of adding one.
+    """
+    test_id: int
+    version: int
+    question_ids: List[int]
+    choice_ids: List[int]
+    rows: Dict[int, int] = field(default_factory=dict)
+    scores: np.ndarray = None
+    answered: np.ndarray = None
+    pending: np.ndarray = None
+    selected: np.ndarray = None
+
+    @classmethod
+    def empty(cls, key: AnswerKey) -> "ItemMatrix":
+        question_ids = sorted(key.questions)
+        choice_ids = sorted(cid for q in key.questions.values() for cid in q.choice_ids)
+        k, m = len(question_ids), len(choice_ids)
+        return cls(
+            test_id=key.test_id,
+            version=key.version,
+            question_ids=question_ids,
+            choice_ids=choice_ids,
+            scores=np.zeros((0, k)),
+            answered=np.zeros((0, k), dtype=bool),
+            pending=np.zeros((0, k), dtype=bool),
+            selected=np.zeros((0, m), dtype=np.int8),
+        )
+
+    def load(self, stream: Iterable[tuple]) -> None:
+        """
+        Fills rows from (attempt_id, question_id, score, needs_manual, choice_id) tuples.
+        An attempt present in the stream fully replaces its previous row.
+        """
+        q_index = {qid: i for i, qid in enumerate(self.question_ids)}
+        c_index = {cid: j for j, cid in enumerate(self.choice_ids)}
+        k, m = len(self.question_ids), len(self.choice_ids)
+
+        batch: Dict[int, tuple] = {}
+        for attempt_id, question_id, score, needs_manual, choice_id in stream:
+            i = q_index.get(question_id)
+            if i is None:
+                continue
+            row = batch.get(attempt_id)
+            if row is None:
+                row = batch[attempt_id] = (
+                    np.zeros(k), np.zeros(k, dtype=bool), np.zeros(k, dtype=bool), np.zeros(m, dtype=np.int8),
+                )
+            # one db row per selected choice: score repeats, so it is assigned, not summed
+            row[0][i] = float(score or 0)
+            row[1][i] = True
+            row[2][i] = bool(needs_manual)
+            j = c_index.get(choice_id)
+            if j is not None:
+                row[3][j] = 1
+
+        fresh = []
+        for attempt_id, (scores, answered, pending, selected) in batch.items():
+            r = self.rows.get(attempt_id)
+            if r is None:
+                fresh.append((attempt_id, scores, answered, pending, selected))
+                continue
+            self.scores[r], self.answered[r], self.pending[r], self.selected[r] = scores, answered, pending, selected
+        if fresh:
+            base = len(self.rows)
+            for offset, item in enumerate(fresh):
+                self.rows[item[0]] = base + offset
+            self.scores = np.vstack([self.scores, [f[1] for f in fresh]])
+            self.answered = np.vstack([self.answered, [f[2] for f in fresh]])
+            self.pending = np.vstack([self.pending, [f[3] for f in fresh]])
+            self.selected = np.vstack([self.selected, [f[4] for f in fresh]])
+
+
+def _answer_rows(test_id: int, attempt_ids: Optional[List[int]] = None):
+    """One streamed query: an answer per row, or one row per selected choice."""
+    qs = AnswerAttempt.objects.filter(attempt__test_id=test_id, attempt__status__in=FINISHED_STATUSES)
+    if attempt_ids is not None:
+        qs = qs.filter(attempt_id__in=attempt_ids)
+    return (
+        qs.order_by()
+        .values_list("attempt_id", "question_id", "score_awarded", "needs_manual", "selected_options__id")
+        .iterator(chunk_size=2000)
+    )
+
+
+def _namespace(test_id: int) -> str:
+    return f"tests:item-analysis:{test_id}"
+
+
+def _cache_key(test_id: int, version: int, generation: int) -> str:
+    # generation moves on every recorded change: a matrix built from an older read,
+    # or a merge that lost the lock, is stored under a key nobody reads any more
+    return f"{_namespace(test_id)}:v{version}:g{generation}"
+
+
+def get_item_matrix(test: Test) -> ItemMatrix:
+    """Matrix for the test's current version: built once from one streamed query, then cached."""
+    generation = get_version(_namespace(test.pk))
+    matrix = cache.get(_cache_key(test.pk, test.version, generation))
+    if matrix is None:
+        matrix = ItemMatrix.empty(get_answer_key(test))
+        matrix.load(_answer_rows(test.pk))
+        cache.add(_cache_key(test.pk, test.version, generation), matrix, ITEM_ANALYSIS_TIMEOUT)
+    return matrix
+
+
+def record_graded_attempts(test: Test, attempt_ids: List[int]) -> None:
+    """
+    Incremental refresh after attempts are submitted or (re)graded: reads only their answers.
+    The read-modify-write runs under a cache.add() lock and publishes under a new generation;
+    if the lock is taken (concurrent submit) the generation is just bumped, so the next
+    get_item_matrix() rebuilds from the DB instead of serving a matrix missing these rows.
+    """
+    if not attempt_ids:
+        return
+    lock_key = f"{_namespace(test.pk)}:lock"
+    if not cache.add(lock_key, 1, MERGE_LOCK_TIMEOUT):
+        bump_version(_namespace(test.pk))
+        return
+    try:
+        matrix = cache.get(_cache_key(test.pk, test.version, get_version(_namespace(test.pk))))
+        generation = bump_version(_namespace(test.pk))
+        if matrix is None:
+            return
+        matrix.load(_answer_rows(test.pk, attempt_ids))
+        cache.set(_cache_key(test.pk, test.version, generation), matrix, ITEM_ANALYSIS_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+
+
+# ---------- Statistics ----------
+
+def _num(value) -> Optional[float]:
+    return None if value is None or not np.isfinite(value) else round(float(value), 4)
+
+
+def _item_total_correlation(scores: np.ndarray) -> np.ndarray:
+    """Corrected point-biserial: each item against the total of the other items."""
+    rest = scores.sum(axis=1, keepdims=True) - scores
+    xc = scores - scores.mean(axis=0)
+    rc = rest - rest.mean(axis=0)
+    den = np.sqrt((xc ** 2).sum(axis=0) * (rc ** 2).sum(axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den > 0, (xc * rc).sum(axis=0) / den, np.nan)
+
+
+def _cronbach_alpha(scores: np.ndarray) -> Optional[float]:
+    n, k = scores.shape
+    if n < 2 or k < 2:
+        return None
+    total_var = scores.sum(axis=1).var(ddof=1)
+    if total_var <= 0:
+        return None
+    return k / (k - 1) * (1 - scores.var(axis=0, ddof=1).sum() / total_var)
+
+
+def item_analysis(test: Test) -> Dict[str, Any]:
+    """
+    Per question: p-value (mean share of points), discrimination (corrected point-biserial),
+    distractor frequencies per choice; for the test: Cronbach's alpha.
+    Unanswered questions count as 0 points; pending_manual shows answers not graded yet.
+    """
+    key = get_answer_key(test)
+    matrix = get_item_matrix(test)
+    scores = matrix.scores
+    n = scores.shape[0]
+    points = np.array([float(key.questions[qid].points) for qid in matrix.question_ids])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_values = np.where(points > 0, scores.mean(axis=0) / points, np.nan) if n else np.full(len(points), np.nan)
+    discrimination = _item_total_correlation(scores) if n > 1 else np.full(len(points), np.nan)
+    answered = matrix.answered.sum(axis=0)
+    pending = matrix.pending.sum(axis=0)
+    picks = matrix.selected.sum(axis=0)
+    c_index = {cid: j for j, cid in enumerate(matrix.choice_ids)}
+    totals = scores.sum(axis=1)
+
+    questions = []
+    for i, qid in enumerate(matrix.question_ids):
+        q = key.questions[qid]
+        item = {
+            "question": qid,
+            "type": q.type,
+            "points": float(q.points),
+            "answered": int(answered[i]),
+            "pending_manual": int(pending[i]),
+            "p_value": _num(p_values[i]),
+            "discrimination": _num(discrimination[i]),
+        }
+        if q.type in CHOICE_TYPES:
+            item["choices"] = [
+                {
+                    "choice": cid,
+                    "is_correct": cid in q.correct_ids,
+                    "count": int(picks[c_index[cid]]),
+                    "share": _num(picks[c_index[cid]] / answered[i]) if answered[i] else None,
+                }
+                for cid in sorted(q.choice_ids)
+            ]
+        questions.append(item)
+
+    return {
+        "test": test.pk,
+        "version": test.version,
+        "attempts": n,
+        "mean_score": _num(totals.mean()) if n else None,
+        "sd_score": _num(totals.std(ddof=1)) if n > 1 else None,
+        "alpha": _num(_cronbach_alpha(scores)),
+        "questions": questions,
+    }
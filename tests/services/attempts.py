@@ -0,0 +1,102 @@
+# tests/services/attempts.py
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateTimeField, ExpressionWrapper, F, Value
+from django.utils import timezone
+
+from ..models import Test, TestAttempt
+from .analytics import record_graded_attempts
+from .grading import AnswerKey, GradedAnswer, get_answer_key, regrade_stored_answers
+from .similarity import SIMILARITY_TYPES, index_attempt_answers
+
+# the sweeper leaves in-flight submits (accepted up to limit + 1s) some slack
+EXPIRY_GRACE = timedelta(seconds=getattr(settings, "ATTEMPT_EXPIRY_GRACE_SEC", 30))
+
+FINALIZE_FIELDS = ["status", "score", "max_score", "finished_at", "duration_sec"]
+
+
+def attempt_deadline(test: Test, attempt: TestAttempt) -> Optional[datetime]:
+    if not test.time_limit_sec or not attempt.started_at:
+        return None
+    return attempt.started_at + timedelta(seconds=test.time_limit_sec)
+
+
+def is_expired(test: Test, attempt: TestAttempt, now: datetime) -> bool:
+    deadline = attempt_deadline(test, attempt)
+    return deadline is not None and now > deadline + timedelta(seconds=1)
+
+
+def finalize_attempts(
+    test: Test, key: AnswerKey, attempts: List[TestAttempt], now: datetime,
+) -> Dict[int, List[GradedAnswer]]:
+    """
+    Moves STARTED attempts of one test to SUBMITTED, scored from their stored answers
+    (re-graded against the current key): two reads, at most one bulk_update of answers,
+    one bulk_update of attempts. Expired attempts end at their deadline and their max_score
+    is the whole test; otherwise max_score counts the answered questions (as on submit).
+    Background follow-ups (analytics, similarity) are queued on commit; CODE answers stay
+    in the manual queue until the grade_code_answers worker runs them.
+    """
+    graded = regrade_stored_answers([a.pk for a in attempts], key)
+
+    for attempt in attempts:
+        rows = graded.get(attempt.pk, [])
+        expired = is_expired(test, attempt, now)
+        attempt.status = TestAttempt.Status.SUBMITTED
+        attempt.score = sum((g.score for g in rows), Decimal("0"))
+        attempt.max_score = key.max_score if expired else sum((g.points for g in rows), Decimal("0"))
+        attempt.finished_at = attempt_deadline(test, attempt) if expired else now
+        if attempt.started_at:
+            attempt.duration_sec = max(0, int((attempt.finished_at - attempt.started_at).total_seconds()))
+    TestAttempt.objects.bulk_update(attempts, FINALIZE_FIELDS)
+
+    attempt_ids = [a.pk for a in attempts]
+    transaction.on_commit(lambda: record_graded_attempts(test, attempt_ids))
+    for attempt_id, rows in graded.items():
+        types = {key.questions[g.question_id].type for g in rows}
+        # long/code answers: MinHash signatures for near-duplicate detection
+        if types & set(SIMILARITY_TYPES):
+            transaction.on_commit(lambda attempt_id=attempt_id: index_attempt_answers(attempt_id))
+    return graded
+
+
+def expire_attempts(now: Optional[datetime] = None, batch_size: int = 500) -> int:
+    """
+    Finalizes STARTED attempts past their test's time limit (+ grace), a batch per transaction.
+    Rows are taken with SKIP LOCKED, so a concurrent submit or another sweeper is never waited on.
+    Returns the number of finalized attempts.
+    """
+    now = now or timezone.now()
+    deadline = ExpressionWrapper(
+        F("started_at") + F("test__time_limit_sec") * Value(timedelta(seconds=1)),
+        output_field=DateTimeField(),
+    )
+    total = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                TestAttempt.objects
+                # partial index attempt_started_idx: only STARTED rows, ordered by started_at
+                .filter(status=TestAttempt.Status.STARTED, test__time_limit_sec__gt=0)
+                .alias(deadline=deadline)
+                .filter(deadline__lt=now - EXPIRY_GRACE)
+                .select_related("test")
+                .order_by("started_at")
+                .select_for_update(skip_locked=True, of=("self",))[:batch_size]
+            )
+            by_test: Dict[int, List[TestAttempt]] = defaultdict(list)
+            for attempt in batch:
+                by_test[attempt.test_id].append(attempt)
+            for attempts in by_test.values():
+                test = attempts[0].test
+                finalize_attempts(test, get_answer_key(test), attempts, now)
+        total += len(batch)
+        if len(batch) < batch_size:
+            return total
@@ -0,0 +1,148 @@
+# tests/services/builder.py
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import transaction
+
+from ..models import Choice, Question
+from .grading import deferred_test_bumps, note_test_changed
+
+# fields the test builder may change
+QUESTION_FIELDS = ("type", "text", "points", "order", "explanation", "difficulty", "required", "spec")
+CHOICE_FIELDS = ("text", "is_correct", "order", "feedback")
+
+# short/long keep a single correct "etalon" choice (uniform FE DTO)
+ETALON_TYPES = (Question.Type.SHORT, Question.Type.LONG)
+
+
+def _pick(data: Dict[str, Any], names: Iterable[str]) -> Dict[str, Any]:
+    return {name: data[name] for name in names if name in data}
+
+
+def _etalon_choices(existing: List[Choice], choices_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Desired choices of a short/long question: existing correct ones are kept, the first of them
+    takes the text of the first incoming choice (or a new etalon is created); the rest are dropped.
+    """
+    desired = [{"id": c.id} for c in existing if c.is_correct]
+    if choices_data:
+        etalon = {"text": choices_data[0].get("text", ""), "is_correct": True, "order": 1}
+        if desired:
+            desired[0].update(etalon)
+        else:
+            desired.insert(0, etalon)
+    return desired
+
+
+class _Plan:
+    """Rows to write, collected in memory: at most one DELETE / UPDATE / INSERT per level."""
+
+    def __init__(self):
+        self.new_questions: List[Question] = []
+        self.updated_questions: List[Question] = []
+        self.question_fields = set()
+        self.new_choices: List[Choice] = []
+        self.updated_choices: List[Choice] = []
+        self.choice_fields = set()
+        self.deleted_choice_ids: List[int] = []
+
+    def update(self, obj, values: Dict[str, Any], rows: list, fields: set) -> None:
+        diff = [name for name, value in values.items() if getattr(obj, name) != value]
+        if diff:
+            for name in diff:
+                setattr(obj, name, values[name])
+            fields.update(diff)
+            rows.append(obj)
+
+    def choices(self, question: Question, existing: List[Choice], desired: List[Dict[str, Any]]) -> None:
+        by_id = {c.id: c for c in existing}
+        seen = set()
+        for cd in desired:
+            choice = by_id.get(cd.get("id"))
+            values = _pick(cd, CHOICE_FIELDS)
+            if choice is None or choice.id in seen:
+                # question may not have a pk yet: attached right before the INSERT
+                self.new_choices.append(Choice(question=question, **values))
+                continue
+            seen.add(choice.id)
+            self.update(choice, values, self.updated_choices, self.choice_fields)
+        self.deleted_choice_ids.extend(pk for pk in by_id if pk not in seen)
+
+
+@transaction.atomic
+def save_question_tree(
+    test_id: int,
+    questions_data: Iterable[Dict[str, Any]],
+    *,
+    existing: Optional[Dict[int, Question]] = None,
+    delete_missing: bool = False,
+    etalon_for_new: bool = False,
+) -> List[Question]:
+    """
+    Writes nested question/choice payloads (validated_data of QuestionSerializer) for a test
+    with a fixed number of statements, whatever the number of questions.
+
+    - a question with an id of this test is updated (only the fields sent, only if changed);
+      its choices are reconciled if "choices" is sent: matched by id, the rest created/deleted;
+    - a question without id (or with a foreign/repeated id) is created with its choices;
+    - delete_missing: the test's questions absent from the payload are deleted.
+    existing — already loaded questions {id: question}; by default all questions of the test.
+    Returns the questions in payload order. The answer key is invalidated with one bump.
+    """
+    if existing is None:
+        existing = {q.id: q for q in Question.objects.filter(test_id=test_id)}
+    questions_data = list(questions_data)
+
+    existing_choices: Dict[int, List[Choice]] = {}
+    if existing and any(qd.get("choices") is not None for qd in questions_data):
+        for c in Choice.objects.filter(question_id__in=list(existing)):
+            existing_choices.setdefault(c.question_id, []).append(c)
+
+    plan = _Plan()
+    result: List[Question] = []
+    seen = set()
+    for qd in questions_data:
+        values = _pick(qd, QUESTION_FIELDS)
+        choices_data = qd.get("choices")
+        question = existing.get(qd.get("id"))
+
+        if question is None or question.id in seen:
+            question = Question(test_id=test_id, **values)
+            plan.new_questions.append(question)
+            desired = choices_data or []
+            if question.type in ETALON_TYPES and etalon_for_new:
+                desired = _etalon_choices([], desired)
+            plan.choices(question, [], desired)
+        else:
+            seen.add(question.id)
+            plan.update(question, values, plan.updated_questions, plan.question_fields)
+            if choices_data is not None:
+                current = existing_choices.get(question.id, [])
+                if question.type in ETALON_TYPES:
+                    choices_data = _etalon_choices(current, choices_data)
+                plan.choices(question, current, choices_data)
+        result.append(question)
+
+    deleted_question_ids = [pk for pk in existing if pk not in seen] if delete_missing else []
+
+    # per-row post_save/post_delete receivers would bump Test.version once per row
+    with deferred_test_bumps():
+        if deleted_question_ids:
+            Question.objects.filter(pk__in=deleted_question_ids).delete()
+        if plan.updated_questions:
+            Question.objects.bulk_update(plan.updated_questions, sorted(plan.question_fields))
+        if plan.new_questions:
+            Question.objects.bulk_create(plan.new_questions)
+        if plan.deleted_choice_ids:
+            Choice.objects.filter(pk__in=plan.deleted_choice_ids).delete()
+        if plan.updated_choices:
+            Choice.objects.bulk_update(plan.updated_choices, sorted(plan.choice_fields))
+        if plan.new_choices:
+            for c in plan.new_choices:
+                c.question_id = c.question.pk
+            Choice.objects.bulk_create(plan.new_choices)
+        if deleted_question_ids or plan.updated_questions or plan.new_questions or plan.deleted_choice_ids \
+                or plan.updated_choices or plan.new_choices:
+            note_test_changed(test_id=test_id)
+    return result
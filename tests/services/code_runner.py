@@ -0,0 +1,297 @@
+# tests/services/code_runner.py
+"""
+Auto-grading of CODE answers against test cases from Question.spec:
+
+    {"language": "python",
+     "tests": [{"input": "1 2\n", "output": "3"}, ...],
+     "time_limit_sec": 2, "memory_mb": 256}
+
+Answers are never run by the web process. Finished attempts leave their CODE answers in
+the manual queue with autograde = NULL; `manage.py grade_code_answers --loop` (a separate
+worker, run as a dedicated unprivileged user) picks them up, runs each case and writes the
+report into AnswerAttempt.autograde. Inside the worker attempts are graded by a bounded
+thread pool (CODE_GRADER_WORKERS jails at a time); more throughput — more worker processes,
+which share the queue through SKIP LOCKED.
+
+Each case runs in a jail (CODE_GRADER_JAIL): by default bubblewrap with fresh user, pid,
+network, ipc and uts namespaces — no network, no view of the host's processes (/proc/<ppid>/
+environ) or of the project tree, only /usr, the interpreter and a read-only copy of the
+answer — plus an optional seccomp filter. Inside, rlimits (CPU, address space, processes,
+file size, open files, no core) are set before exec'ing `python -I -S`. On timeout the jail
+is killed; with the pid namespace gone every process it started goes too, setsid or not.
+Without a jail (or rlimits) nothing is run and answers simply stay in the manual queue.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from ..models import AnswerAttempt, Question, Test, TestAttempt
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits -> no sandbox -> manual grading only
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# "bwrap" — built-in bubblewrap profile; a list — custom prefix, e.g. ["nsjail", "--config", "...", "--"],
+# "{workdir}" in it is replaced by the answer's directory; None — auto-grading disabled.
+JAIL = getattr(settings, "CODE_GRADER_JAIL", "bwrap")
+PYTHON = getattr(settings, "CODE_GRADER_PYTHON", getattr(sys, "_base_executable", None) or sys.executable)
+SECCOMP_FILTER = getattr(settings, "CODE_GRADER_SECCOMP_BPF", None)   # compiled BPF program (bwrap --seccomp)
+WORKERS = getattr(settings, "CODE_GRADER_WORKERS", 4)
+DEFAULT_TIME_LIMIT = getattr(settings, "CODE_GRADER_TIME_LIMIT_SEC", 2)
+DEFAULT_MEMORY_MB = getattr(settings, "CODE_GRADER_MEMORY_MB", 256)
+MAX_PROCESSES = getattr(settings, "CODE_GRADER_MAX_PROCESSES", 16)
+MAX_OUTPUT = 64 * 1024
+SUPPORTED_LANGUAGES = ("python",)
+SANDBOX_DIR = "/sandbox"
+SANDBOX_UID = 65534   # nobody
+
+FINISHED_STATUSES = (TestAttempt.Status.SUBMITTED, TestAttempt.Status.GRADED)
+
+
+# ---------- Sandbox ----------
+
+@dataclass
+class RunResult:
+    stdout: str = ""
+    stderr: str = ""
+    returncode: Optional[int] = None
+    timed_out: bool = False
+
+
+# Applied inside the jail before exec'ing the answer.
+_LIMITER = """
+import os, resource, sys
+cpu, memory, nproc = int(sys.argv[1]), int(sys.argv[2]) * 1024 * 1024, int(sys.argv[3])
+for limit, value in ((resource.RLIMIT_CPU, cpu), (resource.RLIMIT_AS, memory),
+                     (resource.RLIMIT_NPROC, nproc), (resource.RLIMIT_FSIZE, 1024 * 1024),
+                     (resource.RLIMIT_NOFILE, 32), (resource.RLIMIT_CORE, 0)):
+    resource.setrlimit(limit, (value, value))
+os.execv(sys.executable, [sys.executable, "-I", "-S", sys.argv[4]])
+"""
+
+
+def _bwrap_prefix(bwrap: str, workdir: str, seccomp_fd: Optional[int]) -> List[str]:
+    args = [
+        bwrap,
+        "--unshare-all",            # user, pid, net, ipc, uts, cgroup namespaces
+        "--uid", str(SANDBOX_UID), "--gid", str(SANDBOX_UID),
+        "--die-with-parent",
+        "--new-session",
+        "--cap-drop", "ALL",
+        "--ro-bind", "/usr", "/usr",
+    ]
+    for path in ("/bin", "/lib", "/lib64", "/sbin"):
+        if os.path.islink(path):
+            args += ["--symlink", os.readlink(path), path]
+        elif os.path.isdir(path):
+            args += ["--ro-bind", path, path]
+    prefix = sys.base_prefix   # interpreter outside /usr (pyenv, /opt/python): read-only, stdlib only
+    if os.path.commonpath([prefix, "/usr"]) != "/usr":
+        args += ["--ro-bind", prefix, prefix]
+    args += [
+        "--proc", "/proc",
+        "--dev", "/dev",
+        "--tmpfs", "/tmp",
+        "--ro-bind", workdir, SANDBOX_DIR,
+        "--chdir", SANDBOX_DIR,
+    ]
+    if seccomp_fd is not None:
+        args += ["--seccomp", str(seccomp_fd)]
+    return args
+
+
+def jail_prefix(workdir: str, seccomp_fd: Optional[int] = None) -> Optional[List[str]]:
+    """Command prefix that runs the rest of the argv jailed in workdir, or None if no jail is available."""
+    if JAIL == "bwrap":
+        bwrap = shutil.which("bwrap")
+        return _bwrap_prefix(bwrap, workdir, seccomp_fd) if bwrap else None
+    if JAIL:
+        return [str(part).replace("{workdir}", workdir) for part in JAIL]
+    return None
+
+
+def sandbox_available() -> bool:
+    return resource is not None and jail_prefix(tempfile.gettempdir()) is not None
+
+
+def run_python(source: str, stdin: str, *, time_limit: float, memory_mb: int) -> RunResult:
+    with tempfile.TemporaryDirectory(prefix="bb-grader-") as workdir:
+        with open(os.path.join(workdir, "main.py"), "w", encoding="utf-8") as fh:
+            fh.write(source)
+        seccomp = open(SECCOMP_FILTER, "rb") if SECCOMP_FILTER and JAIL == "bwrap" else None
+        try:
+            prefix = jail_prefix(workdir, seccomp.fileno() if seccomp is not None else None)
+            if prefix is None:
+                raise RuntimeError("code grader jail is not available")
+            argv = [*prefix, PYTHON, "-I", "-S", "-c", _LIMITER,
+                    str(int(time_limit) + 1), str(memory_mb), str(MAX_PROCESSES), "main.py"]
+            proc = subprocess.Popen(
+                argv,
+                cwd=workdir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env={"PATH": "/usr/bin:/bin", "PYTHONIOENCODING": "utf-8"},
+                pass_fds=(seccomp.fileno(),) if seccomp is not None else (),
+                start_new_session=True,
+            )
+        finally:
+            if seccomp is not None:
+                seccomp.close()
+        try:
+            out, err = proc.communicate(stdin.encode("utf-8"), timeout=time_limit)
+            timed_out = False
+        except subprocess.TimeoutExpired:
+            # the jail's pid namespace dies with it, taking any setsid()'d children along
+            os.killpg(proc.pid, signal.SIGKILL)
+            out, err = proc.communicate()
+            timed_out = True
+    return RunResult(
+        stdout=out[:MAX_OUTPUT].decode("utf-8", "replace"),
+        stderr=err[:MAX_OUTPUT].decode("utf-8", "replace"),
+        returncode=proc.returncode,
+        timed_out=timed_out,
+    )
+
+
+def _normalize_output(value: str) -> str:
+    return "\n".join(line.rstrip() for line in str(value).strip().splitlines())
+
+
+def code_cases(spec: Any) -> List[Tuple[str, str]]:
+    """[(stdin, expected stdout)] or [] if the question cannot be auto-graded."""
+    if not isinstance(spec, dict) or spec.get("language", "python") not in SUPPORTED_LANGUAGES:
+        return []
+    cases = []
+    for case in spec.get("tests") or []:
+        if isinstance(case, dict) and "output" in case:
+            cases.append((str(case.get("input") or ""), str(case["output"])))
+    return cases
+
+
+def check_code(source: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs all cases; report = {"passed", "total", "cases": [{"ok", "timed_out", "error"}]}."""
+    time_limit = float(spec.get("time_limit_sec") or DEFAULT_TIME_LIMIT)
+    memory_mb = int(spec.get("memory_mb") or DEFAULT_MEMORY_MB)
+    results = []
+    for stdin, expected in code_cases(spec):
+        run = run_python(source, stdin, time_limit=time_limit, memory_mb=memory_mb)
+        ok = not run.timed_out and run.returncode == 0 and _normalize_output(run.stdout) == _normalize_output(expected)
+        results.append({
+            "ok": ok,
+            "timed_out": run.timed_out,
+            "error": run.stderr.strip().splitlines()[-1][:300] if run.returncode and run.stderr.strip() else "",
+        })
+    return {"passed": sum(r["ok"] for r in results), "total": len(results), "cases": results}
+
+
+# ---------- Queue ----------
+
+def pending_code_answers():
+    """CODE answers of finished attempts still waiting for the auto-grader (teacher-graded ones excluded)."""
+    return AnswerAttempt.objects.filter(
+        needs_manual=True,
+        autograde__isnull=True,
+        question__type=Question.Type.CODE,
+        attempt__status__in=FINISHED_STATUSES,
+    )
+
+
+def _run_answer(answer: AnswerAttempt) -> Dict[str, Any]:
+    spec = answer.question.spec if isinstance(answer.question.spec, dict) else {}
+    if not code_cases(spec) or not answer.free_text:
+        return {"status": "skipped"}
+    try:
+        return {"status": "graded", **check_code(answer.free_text, spec)}
+    except Exception as exc:
+        logger.exception("Code auto-grading failed for answer %s; left for manual grading", answer.pk)
+        return {"status": "error", "error": str(exc)[:300]}
+
+
+def grade_code_attempt(attempt_id: int) -> int:
+    """
+    Grades the attempt's pending CODE answers that have test cases: score = points × passed/total.
+    The answers and their attempt are locked for the run (SKIP LOCKED: an attempt a teacher is
+    grading right now is retried on the next sweep), so a manual grade is never overwritten and
+    answers graded by a teacher meanwhile are not picked. Every taken answer gets its report in
+    `autograde` (skipped/error ones stay in the manual queue). Returns the auto-graded count.
+    """
+    from .analytics import record_graded_attempts
+    from .grading import GRADE_FIELDS, recompute_attempt_scores
+
+    with transaction.atomic():
+        answers = list(
+            pending_code_answers()
+            .filter(attempt_id=attempt_id)
+            .select_related("question", "attempt")
+            .select_for_update(of=("self", "attempt"), skip_locked=True)
+        )
+        graded = 0
+        for a in answers:
+            report = _run_answer(a)
+            a.autograde = report
+            if report["status"] != "graded":
+                continue
+            points = Decimal(a.question.points)
+            a.score_awarded = (points * report["passed"] / report["total"]).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+            a.is_correct = report["passed"] == report["total"]
+            a.needs_manual = False
+            graded += 1
+        if not answers:
+            return 0
+        AnswerAttempt.objects.bulk_update(answers, [*GRADE_FIELDS, "autograde"])
+        if graded:
+            recompute_attempt_scores([attempt_id])
+            test = Test.objects.filter(attempts__id=attempt_id).first()
+            if test is not None:
+                transaction.on_commit(lambda: record_graded_attempts(test, [attempt_id]))
+    return graded
+
+
+def _grade_one(attempt_id: int) -> int:
+    try:
+        return grade_code_attempt(attempt_id)
+    except Exception:
+        logger.exception("Code auto-grading failed for attempt %s; retried on the next sweep", attempt_id)
+        return 0
+
+
+def _pool_job(attempt_id: int) -> int:
+    try:
+        return _grade_one(attempt_id)
+    finally:
+        connection.close()   # pool threads keep no db connections between jobs
+
+
+def grade_pending_code_answers(batch_size: int = 50, workers: int = WORKERS) -> int:
+    """
+    One worker sweep: up to batch_size attempts with pending CODE answers, oldest first,
+    graded `workers` at a time (each attempt in its own transaction and jails).
+    Returns the number of auto-graded answers.
+    """
+    attempt_ids = list(
+        pending_code_answers()
+        .order_by("attempt_id")
+        .values_list("attempt_id", flat=True)
+        .distinct()[:batch_size]
+    )
+    if len(attempt_ids) <= 1 or workers <= 1:
+        return sum(_grade_one(attempt_id) for attempt_id in attempt_ids)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="code-grader") as pool:
+        return sum(pool.map(_pool_job, attempt_ids))
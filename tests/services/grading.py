@@ -0,0 +1,348 @@
+# tests/services/grading.py
+from __future__ import annotations
+
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, DecimalField, Exists, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+from django.utils import timezone
+
+from ..models import AnswerAttempt, Choice, Question, Test, TestAttempt
+
+ANSWER_KEY_TIMEOUT = getattr(settings, "ANSWER_KEY_CACHE_TIMEOUT", 60 * 60 * 24)
+
+CHOICE_TYPES = (Question.Type.SINGLE, Question.Type.MULTIPLE, Question.Type.TRUE_FALSE)
+FREE_TEXT_TYPES = (Question.Type.SHORT, Question.Type.LONG, Question.Type.CODE)
+STRUCTURED_TYPES = (Question.Type.MATCH, Question.Type.ORDER)
+
+_CENT = Decimal("0.01")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def bump_test_versions(*conditions, **filters) -> int:
+    """Invalidate compiled answer keys for tests matching filters (paths that bypass Test.save())."""
+    return Test.objects.filter(*conditions, **filters).update(version=F("version") + 1, updated_at=timezone.now())
+
+
+_pending_bumps: ContextVar[Optional[Tuple[set, set]]] = ContextVar("pending_test_bumps", default=None)
+
+
+@contextmanager
+def deferred_test_bumps():
+    """
+    Inside the block note_test_changed() only collects test/question ids;
+    on exit they are bumped with one UPDATE instead of one per saved/deleted row.
+    """
+    if _pending_bumps.get() is not None:
+        yield
+        return
+    test_ids, question_ids = set(), set()
+    token = _pending_bumps.set((test_ids, question_ids))
+    try:
+        yield
+    finally:
+        _pending_bumps.reset(token)
+    if test_ids or question_ids:
+        bump_test_versions(Q(pk__in=test_ids) | Q(questions__id__in=question_ids))
+
+
+def note_test_changed(test_id: Optional[int] = None, question_id: Optional[int] = None) -> None:
+    pending = _pending_bumps.get()
+    if pending is not None:
+        if test_id is not None:
+            pending[0].add(test_id)
+        if question_id is not None:
+            pending[1].add(question_id)
+    elif test_id is not None:
+        bump_test_versions(pk=test_id)
+    elif question_id is not None:
+        bump_test_versions(questions__id=question_id)
+
+
+def normalize_short_answer(value: Any) -> str:
+    """Case-insensitive, whitespace-insensitive form used on both sides of a short-answer comparison."""
+    return _SPACES_RE.sub(" ", str(value)).strip().casefold()
+
+
+# ---------- Compiled answer key ----------
+
+@dataclass(frozen=True)
+class QuestionKey:
+    id: int
+    type: str
+    points: Decimal
+    choice_ids: FrozenSet[int] = frozenset()
+    correct_ids: FrozenSet[int] = frozenset()
+    synonyms: FrozenSet[str] = frozenset()   # short: normalized spec.answers (empty -> manual)
+    solution: Any = None                     # match/order: spec.solution
+    has_solution: bool = False
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    test_id: int
+    version: int
+    questions: Dict[int, QuestionKey] = field(default_factory=dict)
+
+    @property
+    def max_score(self) -> Decimal:
+        return sum((q.points for q in self.questions.values()), Decimal("0"))
+
+
+def _compile_answer_key(test_id: int, version: int) -> AnswerKey:
+    choices: Dict[int, List[Tuple[int, bool]]] = {}
+    for qid, cid, is_correct in Choice.objects.filter(question__test_id=test_id).values_list(
+        "question_id", "id", "is_correct"
+    ):
+        choices.setdefault(qid, []).append((cid, is_correct))
+
+    questions = {}
+    for q in Question.objects.filter(test_id=test_id).only("id", "type", "points", "spec"):
+        spec = q.spec if isinstance(q.spec, dict) else {}
+        q_choices = choices.get(q.id, [])
+        questions[q.id] = QuestionKey(
+            id=q.id,
+            type=q.type,
+            points=Decimal(q.points),
+            choice_ids=frozenset(cid for cid, _ in q_choices),
+            correct_ids=frozenset(cid for cid, ok in q_choices if ok),
+            synonyms=frozenset(normalize_short_answer(s) for s in (spec.get("answers") or [])),
+            solution=spec.get("solution"),
+            has_solution=spec.get("solution") is not None,
+        )
+    return AnswerKey(test_id=test_id, version=version, questions=questions)
+
+
+def get_answer_key(test: Test) -> AnswerKey:
+    """Answer key for the test's current version: compiled once (2 queries), then served from cache."""
+    cache_key = f"tests:answer-key:{test.pk}:v{test.version}"
+    key = cache.get(cache_key)
+    if key is None:
+        key = _compile_answer_key(test.pk, test.version)
+        cache.set(cache_key, key, ANSWER_KEY_TIMEOUT)
+    return key
+
+
+# ---------- In-memory grading ----------
+
+@dataclass
+class GradedAnswer:
+    question_id: int
+    points: Decimal
+    selected_ids: List[int] = field(default_factory=list)
+    free_text: str = ""
+    free_json: Any = field(default_factory=dict)
+    is_correct: Optional[bool] = None
+    score: Decimal = Decimal("0")
+    needs_manual: bool = False
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def grade_answer(q: QuestionKey, item: Dict[str, Any]) -> GradedAnswer:
+    graded = GradedAnswer(question_id=q.id, points=q.points)
+
+    if q.type in (Question.Type.SINGLE, Question.Type.TRUE_FALSE):
+        selected = _as_int(item.get("selected")) if item.get("selected") else None
+        if selected in q.choice_ids:
+            graded.selected_ids = [selected]
+            graded.is_correct = selected in q.correct_ids
+            graded.score = q.points if graded.is_correct else Decimal("0")
+
+    elif q.type == Question.Type.MULTIPLE:
+        raw = item.get("selected") or []
+        picked = {cid for cid in map(_as_int, raw if isinstance(raw, list) else [raw]) if cid in q.choice_ids}
+        graded.selected_ids = sorted(picked)
+        # partial: (good - bad) / #correct, clipped to [0..1]
+        if q.correct_ids:
+            good = len(picked & q.correct_ids)
+            bad = len(picked - q.correct_ids)
+            ratio = Decimal(max(good - bad, 0)) / len(q.correct_ids)
+            graded.score = (q.points * ratio).quantize(_CENT, rounding=ROUND_HALF_UP)
+            graded.is_correct = good == len(q.correct_ids) and bad == 0
+
+    elif q.type in FREE_TEXT_TYPES:
+        graded.free_text = (item.get("text") or "").strip()
+        if q.type == Question.Type.SHORT and q.synonyms:
+            graded.is_correct = normalize_short_answer(graded.free_text) in q.synonyms
+            graded.score = q.points if graded.is_correct else Decimal("0")
+        else:
+            graded.needs_manual = True
+
+    elif q.type in STRUCTURED_TYPES:
+        graded.free_json = item.get("data") or {}
+        if q.has_solution:
+            graded.is_correct = graded.free_json == q.solution
+            graded.score = q.points if graded.is_correct else Decimal("0")
+        else:
+            graded.needs_manual = True
+
+    return graded
+
+
+def grade_submission(key: AnswerKey, answers: Iterable[Dict[str, Any]]) -> List[GradedAnswer]:
+    """
+    Grades submitted answers against the key without touching the database.
+    Unknown questions are ignored; a repeated question keeps its last answer.
+    """
+    by_question: Dict[int, GradedAnswer] = {}
+    for item in answers or []:
+        if not isinstance(item, dict):
+            continue
+        q = key.questions.get(_as_int(item.get("question")))
+        if q is not None:
+            by_question[q.id] = grade_answer(q, item)
+    return list(by_question.values())
+
+
+# ---------- Persistence ----------
+
+GRADE_FIELDS = ("is_correct", "score_awarded", "needs_manual")
+
+
+def upsert_graded_answers(attempt, graded: List[GradedAnswer]) -> List[AnswerAttempt]:
+    """
+    Stores answers as INSERT ... ON CONFLICT (attempt, question) DO UPDATE, then replaces their
+    selected_options: one bulk upsert, one DELETE and one bulk INSERT into the through table.
+    """
+    if not graded:
+        return []
+    rows = AnswerAttempt.objects.bulk_create(
+        [
+            AnswerAttempt(
+                attempt=attempt,
+                question_id=g.question_id,
+                free_text=g.free_text,
+                free_json=g.free_json,
+                is_correct=g.is_correct,
+                score_awarded=g.score,
+                needs_manual=g.needs_manual,
+            )
+            for g in graded
+        ],
+        update_conflicts=True,
+        unique_fields=["attempt", "question"],
+        update_fields=["free_text", "free_json", *GRADE_FIELDS, "answered_at"],
+    )
+    Through = AnswerAttempt.selected_options.through
+    Through.objects.filter(answerattempt_id__in=[row.pk for row in rows]).delete()
+    links = [
+        Through(answerattempt_id=row.pk, choice_id=cid)
+        for row, g in zip(rows, graded)
+        for cid in g.selected_ids
+    ]
+    if links:
+        Through.objects.bulk_create(links)
+    return rows
+
+
+def regrade_stored_answers(attempt_ids: List[int], key: AnswerKey) -> Dict[int, List[GradedAnswer]]:
+    """
+    Grades what is already stored for the attempts (two reads) against the current key;
+    rows whose result changed — e.g. the test was edited mid-attempt — get one bulk_update.
+    Returns {attempt id: graded answers}.
+    """
+    Through = AnswerAttempt.selected_options.through
+    selected: Dict[int, List[int]] = {}
+    for answer_id, choice_id in Through.objects.filter(answerattempt__attempt_id__in=attempt_ids).values_list(
+        "answerattempt_id", "choice_id"
+    ):
+        selected.setdefault(answer_id, []).append(choice_id)
+
+    graded: Dict[int, List[GradedAnswer]] = {}
+    changed = []
+    for row in AnswerAttempt.objects.filter(attempt_id__in=attempt_ids):
+        q = key.questions.get(row.question_id)
+        if q is None:
+            continue
+        ids = selected.get(row.pk, [])
+        item = {
+            "selected": ids if q.type == Question.Type.MULTIPLE else (ids[0] if ids else None),
+            "text": row.free_text,
+            "data": row.free_json,
+        }
+        g = grade_answer(q, item)
+        graded.setdefault(row.attempt_id, []).append(g)
+        if (row.is_correct, row.score_awarded, row.needs_manual) != (g.is_correct, g.score, g.needs_manual):
+            row.is_correct, row.score_awarded, row.needs_manual = g.is_correct, g.score, g.needs_manual
+            changed.append(row)
+    if changed:
+        AnswerAttempt.objects.bulk_update(changed, list(GRADE_FIELDS))
+    return graded
+
+
+# ---------- Manual grading ----------
+
+def apply_manual_grades(test: Test, grades: List[Dict[str, Any]]) -> List[int]:
+    """
+    grades: [{"answer": id, "score": Decimal, "is_correct": bool|None}] for answers of this test.
+    One SELECT, one bulk_update, one aggregate UPDATE of the affected attempts.
+    Answers and their attempts are locked (as submit/auto-grading lock them); answers of
+    attempts still in progress are rejected — finalize would re-grade them over the manual score.
+    Returns the affected attempt ids.
+    """
+    by_id = {g["answer"]: g for g in grades}
+    answers = list(
+        AnswerAttempt.objects.filter(pk__in=list(by_id), attempt__test=test)
+        .select_related("question", "attempt")
+        .only("id", "attempt_id", "question__points", "attempt__status")
+        .select_for_update(of=("self", "attempt"))
+    )
+    missing = set(by_id) - {a.pk for a in answers}
+    if missing:
+        raise serializers.ValidationError({"grades": [f"Відповіді не належать тесту: {sorted(missing)}."]})
+
+    errors = {}
+    for a in answers:
+        g = by_id[a.pk]
+        if a.attempt.status == TestAttempt.Status.STARTED:
+            errors[a.pk] = "Спроба ще триває — оцінити можна після здачі."
+            continue
+        points = Decimal(a.question.points)
+        if g["score"] > points:
+            errors[a.pk] = f"Більше за максимум ({points})."
+            continue
+        a.score_awarded = g["score"]
+        a.is_correct = g["is_correct"] if g.get("is_correct") is not None else g["score"] == points
+        a.needs_manual = False
+    if errors:
+        raise serializers.ValidationError({"grades": errors})
+
+    AnswerAttempt.objects.bulk_update(answers, list(GRADE_FIELDS))
+    attempt_ids = sorted({a.attempt_id for a in answers})
+    recompute_attempt_scores(attempt_ids)
+    return attempt_ids
+
+
+def recompute_attempt_scores(attempt_ids: List[int]) -> int:
+    """
+    One UPDATE: score = sum of awarded points; a finished attempt without pending
+    manual answers becomes GRADED.
+    """
+    answers = AnswerAttempt.objects.filter(attempt=OuterRef("pk")).order_by().values("attempt")
+    total = answers.annotate(s=Sum("score_awarded")).values("s")
+    pending = AnswerAttempt.objects.filter(attempt=OuterRef("pk"), needs_manual=True)
+    return TestAttempt.objects.filter(pk__in=attempt_ids).update(
+        score=Coalesce(
+            Subquery(total, output_field=DecimalField(max_digits=7, decimal_places=2)),
+            Value(Decimal("0")),
+            output_field=DecimalField(max_digits=7, decimal_places=2),
+        ),
+        status=Case(
+            When(Q(status=TestAttempt.Status.SUBMITTED) & ~Exists(pending), then=Value(TestAttempt.Status.GRADED)),
+            default=F("status"),
+        ),
+    )
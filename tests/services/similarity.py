@@ -0,0 +1,251 @@
+# tests/services/similarity.py
+"""
+Near-duplicate detection for long/code answers: shingles -> MinHash -> LSH.
+
+Each finished answer gets a NUM_PERM-value MinHash signature once (AnswerSignature);
+the signature is cut into BANDS bands of ROWS values, and every band is hashed into a
+bucket (AnswerSignatureBand). Answers sharing a bucket are candidates; a candidate pair
+is confirmed when the share of equal MinHash values (≈ Jaccard similarity of shingle
+sets) is at least SIMILARITY_THRESHOLD. Work is linear in the number of answers plus
+the (small) number of candidate pairs, instead of comparing all pairs.
+
+Answers are signed when their attempt is finalized (index_attempt_answers); answers that
+missed it are signed by `manage.py index_answer_signatures`, never on a read. Clusters are
+cached per question and invalidated whenever a signature of that question is added or removed.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from brainboost.cache_versions import bump_version, get_version
+
+from ..models import AnswerAttempt, AnswerSignature, AnswerSignatureBand, Question, TestAttempt
+
+NUM_PERM = 128
+BANDS, ROWS = 16, 8                # P(candidate) ≈ 1 - (1 - s^8)^16: ~0.7 threshold
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = getattr(settings, "ANSWER_SIMILARITY_THRESHOLD", 0.8)
+CLUSTERS_TIMEOUT = getattr(settings, "ANSWER_CLUSTERS_CACHE_TIMEOUT", 60 * 60 * 24)
+
+SIMILARITY_TYPES = (Question.Type.LONG, Question.Type.CODE)
+
+_PRIME = np.uint64(4294967291)     # largest prime < 2^32
+_rng = np.random.default_rng(20240917)   # fixed: signatures must stay comparable across processes
+_A = _rng.integers(1, 2 ** 31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2 ** 31, NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"\w+")
+_CODE_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def _tokens(text: str, question_type: str) -> List[str]:
+    pattern = _CODE_TOKEN_RE if question_type == Question.Type.CODE else _WORD_RE
+    return pattern.findall(text.casefold())
+
+
+def _shingle_hashes(tokens: List[str]) -> np.ndarray:
+    size = min(SHINGLE_SIZE, len(tokens))
+    shingles = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def minhash(text: str, question_type: str) -> Optional[np.ndarray]:
+    """NUM_PERM × uint32 signature, or None for an empty answer."""
+    tokens = _tokens(text or "", question_type)
+    if not tokens:
+        return None
+    hashes = _shingle_hashes(tokens)
+    # (a·x + b) mod p for every permutation × shingle, min over shingles
+    permuted = (np.outer(_A, hashes) + _B[:, None]) % _PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit bucket per band (band number is part of the hash)."""
+    buckets = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(bytes([band]) + chunk, digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def _load(blob) -> np.ndarray:
+    return np.frombuffer(bytes(blob), dtype=np.uint32)
+
+
+# ---------- Indexing ----------
+
+def _finished_answers():
+    return AnswerAttempt.objects.filter(
+        question__type__in=SIMILARITY_TYPES,
+        attempt__status__in=(TestAttempt.Status.SUBMITTED, TestAttempt.Status.GRADED),
+        signature__isnull=True,
+    )
+
+
+def _namespace(question_id: int) -> str:
+    return f"tests:similarity:{question_id}"
+
+
+def bump_question_clusters(question_ids: Iterable[int]) -> None:
+    """Cached clusters of these questions are stale (signatures added or deleted)."""
+    for question_id in set(question_ids):
+        bump_version(_namespace(question_id))
+
+
+def index_answers(answers: Iterable[AnswerAttempt]) -> int:
+    """
+    Stores signatures + band buckets for the given answers (question must be loaded).
+    Answers signed concurrently by someone else are skipped row by row (ON CONFLICT DO NOTHING);
+    bands are written only for the signatures this call inserted. Returns their number.
+    """
+    signatures, buckets = [], {}
+    for a in answers:
+        sig = minhash(a.free_text, a.question.type)
+        if sig is None:
+            continue
+        signatures.append(AnswerSignature(answer_id=a.pk, question_id=a.question_id, minhash=sig.tobytes()))
+        buckets[a.pk] = band_buckets(sig)
+    if not signatures:
+        return 0
+    with transaction.atomic():
+        AnswerSignature.objects.bulk_create(signatures, ignore_conflicts=True)
+        # a conflicting insert has committed by now together with its bands, so band-less rows are ours
+        inserted = list(
+            AnswerSignature.objects
+            .filter(answer_id__in=buckets, bands__isnull=True)
+            .values_list("pk", "answer_id", "question_id")
+        )
+        AnswerSignatureBand.objects.bulk_create(
+            AnswerSignatureBand(signature_id=pk, question_id=question_id, bucket=bucket)
+            for pk, answer_id, question_id in inserted
+            for bucket in buckets[answer_id]
+        )
+        question_ids = {question_id for _, _, question_id in inserted}
+        transaction.on_commit(lambda: bump_question_clusters(question_ids))
+    return len(inserted)
+
+
+def index_attempt_answers(attempt_id: int) -> int:
+    """Incremental: after submit only this attempt's new long/code answers are signed."""
+    return index_answers(_finished_answers().filter(attempt_id=attempt_id).select_related("question"))
+
+
+def backfill_signatures(question_id: Optional[int] = None, batch_size: int = 500) -> int:
+    """Signs finished answers that missed the submit hook (management command, not request path)."""
+    total = 0
+    last_id = 0
+    pending = _finished_answers().select_related("question").order_by("id")
+    if question_id is not None:
+        pending = pending.filter(question_id=question_id)
+    while True:
+        batch = list(pending.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return total
+        total += index_answers(batch)
+        last_id = batch[-1].id
+
+
+# ---------- Clusters ----------
+
+def question_clusters(question_id: int) -> List[Dict]:
+    """
+    Suspicious clusters for one question: [{"answers": [ids], "attempts": [ids], "similarity": min pair}].
+    Cached until a signature of the question changes; on a miss — one query over signatures,
+    one over band buckets. Identical signatures are merged before pairing, so a batch of
+    copy-pasted answers costs one representative instead of a quadratic number of pairs.
+    """
+    key = f"{_namespace(question_id)}:v{get_version(_namespace(question_id))}"
+    clusters = cache.get(key)
+    if clusters is None:
+        clusters = _build_clusters(question_id)
+        cache.set(key, clusters, CLUSTERS_TIMEOUT)
+    return clusters
+
+
+def _build_clusters(question_id: int) -> List[Dict]:
+    rows: Dict[int, tuple] = {}
+    representative: Dict[int, int] = {}      # signature pk -> pk of the first identical signature
+    by_blob: Dict[bytes, int] = {}
+    for pk, answer_id, attempt_id, blob in (
+        AnswerSignature.objects
+        .filter(question_id=question_id)
+        .order_by("pk")
+        .values_list("pk", "answer_id", "answer__attempt_id", "minhash")
+    ):
+        blob = bytes(blob)
+        rows[pk] = (answer_id, attempt_id)
+        representative[pk] = by_blob.setdefault(blob, pk)
+    if not rows:
+        return []
+    vectors = {pk: _load(blob) for blob, pk in by_blob.items()}
+
+    buckets: Dict[int, Set[int]] = {}
+    for signature_id, bucket in AnswerSignatureBand.objects.filter(question_id=question_id).values_list(
+        "signature_id", "bucket"
+    ):
+        if signature_id in representative:
+            buckets.setdefault(bucket, set()).add(representative[signature_id])
+    pairs: Set[tuple] = set()
+    for members in buckets.values():
+        if len(members) > 1:
+            members = sorted(members)
+            pairs.update((x, y) for i, x in enumerate(members) for y in members[i + 1:])
+
+    parent = {pk: pk for pk in vectors}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    weakest: Dict[int, float] = {}            # representative -> min similarity of pairs touching it
+    for x, y in pairs:
+        similarity = float(np.mean(vectors[x] == vectors[y]))
+        if similarity >= SIMILARITY_THRESHOLD:
+            parent[find(x)] = find(y)
+            for pk in (x, y):
+                weakest[pk] = min(similarity, weakest.get(pk, 1.0))
+
+    copies: Dict[int, List[int]] = {}
+    for pk, rep in representative.items():
+        copies.setdefault(rep, []).append(pk)
+    groups: Dict[int, List[int]] = {}
+    for rep, members in copies.items():
+        if rep in weakest or len(members) > 1:   # confirmed pair, or identical copies
+            groups.setdefault(find(rep), []).extend(members)
+    clusters = []
+    for root, members in groups.items():
+        members.sort(key=lambda pk: rows[pk][0])
+        reps = {representative[pk] for pk in members}
+        similarity = min((weakest[rep] for rep in reps if rep in weakest), default=1.0)
+        clusters.append({
+            "answers": [rows[pk][0] for pk in members],
+            "attempts": [rows[pk][1] for pk in members],
+            "similarity": round(similarity, 3),
+        })
+    clusters.sort(key=lambda c: (-len(c["answers"]), -c["similarity"]))
+    return clusters
+
+
+def similar_answers_map(question_ids: Iterable[int]) -> Dict[int, List[int]]:
+    """{answer id: other answer ids in its cluster} for the given questions (grading queue)."""
+    result: Dict[int, List[int]] = {}
+    for question_id in set(question_ids):
+        for cluster in question_clusters(question_id):
+            for answer_id in cluster["answers"]:
+                result[answer_id] = [other for other in cluster["answers"] if other != answer_id]
+    return result
@@ -2,7 +2,8 @@
 from django.urls import path
 from .views import (
     TestListCreateView, TestRetrieveUpdateDestroyView, TestPublicDetailView,
-    StartAttemptView, SubmitAttemptView, CreateTestView,
+    StartAttemptView, SaveAnswersView, SubmitAttemptView, CreateTestView,
+    TestAnalyticsView, GradingQueueView, ManualGradeView, AnswerSimilarityView,
     LessonTestByLessonView, check_lesson_test,
 )
 
@@ -11,8 +12,14 @@ urlpatterns = [
     path('<int:pk>/', TestRetrieveUpdateDestroyView.as_view(), name='test-detail'),
     path('create/', CreateTestView.as_view(), name='test-create'),
 
+    path('<int:pk>/analytics/', TestAnalyticsView.as_view(), name='test-analytics'),
+    path('<int:pk>/grading/queue/', GradingQueueView.as_view(), name='grading-queue'),
+    path('<int:pk>/grading/', ManualGradeView.as_view(), name='grading-batch'),
+    path('<int:pk>/grading/similarity/', AnswerSimilarityView.as_view(), name='grading-similarity'),
+
     path('<int:pk>/public/', TestPublicDetailView.as_view(), name='test-public'),
     path('<int:pk>/attempts/start/', StartAttemptView.as_view(), name='attempt-start'),
+    path('<int:pk>/attempts/<int:attempt_id>/answers/', SaveAnswersView.as_view(), name='attempt-answers'),
     path('<int:pk>/attempts/<int:attempt_id>/submit/', SubmitAttemptView.as_view(), name='attempt-submit'),
 
     path('lessons/<int:lesson_id>/test/', LessonTestByLessonView.as_view(), name='lesson-test'),
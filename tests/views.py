@@ -1,6 +1,6 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from django.db import transaction
-from django.db.models import Max
+from django.db.models import Max, Prefetch
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.db import IntegrityError
@@ -9,14 +9,22 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import PermissionDenied
 
 from lesson.models import Lesson
 from .models import Test, Question, Choice, TestAttempt, AnswerAttempt
 from .serializers import (
     TestSerializer, QuestionSerializer,
-    TestAttemptSerializer, TestAttemptDetailSerializer
+    TestAttemptSerializer, TestAttemptDetailSerializer,
+    GradingQueueItemSerializer, ManualGradeBatchSerializer,
 )
 from .permissions import HasCourseAccess
+from .services.analytics import item_analysis, record_graded_attempts
+from .services.attempts import finalize_attempts, is_expired
+from .services.similarity import SIMILARITY_TYPES, question_clusters, similar_answers_map
+from .services.grading import (
+    AnswerKey, apply_manual_grades, get_answer_key, grade_submission, upsert_graded_answers,
+)
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 
@@ -48,9 +56,17 @@ def _sanitize_test_for_student(test: Test, data: Dict[str, Any], *, shuffle_q: b
     return data
 
 
-def _build_breakdown_payload(attempt: TestAttempt) -> List[Dict[str, Any]]:
+def _build_breakdown_payload(attempt: TestAttempt, key: Optional[AnswerKey] = None) -> List[Dict[str, Any]]:
+    """
+    Fixed number of queries whatever the attempt size: answers+questions, selected choices
+    (prefetch), and the test's answer key (cached) for correct ids.
+    """
+    key = key or get_answer_key(attempt.test)
+    answers = attempt.answers.select_related('question').prefetch_related(
+        Prefetch('selected_options', queryset=Choice.objects.only('id'))
+    )
     out: List[Dict[str, Any]] = []
-    for aa in attempt.answers.select_related('question').prefetch_related('selected_options', 'question__choices'):
+    for aa in answers:
         q = aa.question
         item: Dict[str, Any] = {
             "question": q.id,
@@ -61,11 +77,12 @@ def _build_breakdown_payload(attempt: TestAttempt) -> List[Dict[str, Any]]:
             "needs_manual": aa.needs_manual,
         }
         # selected ids for choice-based
-        item["selected_option_ids"] = list(aa.selected_options.values_list('id', flat=True)) if aa.selected_options.exists() else []
+        item["selected_option_ids"] = [c.id for c in aa.selected_options.all()]
 
         # correct ids for highlighting
         if q.type in ['single', 'multiple', 'true_false']:
-            item["correct_option_ids"] = list(q.choices.filter(is_correct=True).values_list('id', flat=True))
+            q_key = key.questions.get(q.id)
+            item["correct_option_ids"] = sorted(q_key.correct_ids) if q_key else []
 
         # free payloads
         if aa.free_text:
@@ -77,7 +94,7 @@ def _build_breakdown_payload(attempt: TestAttempt) -> List[Dict[str, Any]]:
     return out
 
 
-def _respect_feedback_mode(test: Test, attempt: TestAttempt) -> Dict[str, Any]:
+def _respect_feedback_mode(test: Test, attempt: TestAttempt, key: Optional[AnswerKey] = None) -> Dict[str, Any]:
     """Return attempt payload according to show_feedback_mode (none|immediate|after_close)."""
     payload = TestAttemptSerializer(attempt).data
     mode = (test.show_feedback_mode or 'after_close').lower()
@@ -87,11 +104,11 @@ def _respect_feedback_mode(test: Test, attempt: TestAttempt) -> Dict[str, Any]:
     if mode == 'none':
         return payload
     if mode == 'immediate':
-        payload["breakdown"] = _build_breakdown_payload(attempt)
+        payload["breakdown"] = _build_breakdown_payload(attempt, key)
         return payload
     # after_close
     if is_closed:
-        payload["breakdown"] = _build_breakdown_payload(attempt)
+        payload["breakdown"] = _build_breakdown_payload(attempt, key)
     return payload
 
 
@@ -224,6 +241,147 @@ class StartAttemptView(APIView):
         return Response(TestAttemptSerializer(attempt).data, status=201)
 
 
+# ---------- Teacher: item analytics ----------
+
+class TestAnalyticsView(APIView):
+    """
+    GET <pk>/analytics/ — psychometrics per question (p-value, discrimination, distractors)
+    and Cronbach's alpha over finished attempts. Author/staff only.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk: int):
+        test = get_object_or_404(Test.objects.select_related('lesson__course'), pk=pk)
+        if not _is_course_author_or_staff(request.user, test.lesson.course):
+            return Response({"detail": "Немає прав."}, status=status.HTTP_403_FORBIDDEN)
+        return Response(item_analysis(test), status=200)
+
+
+# ---------- Teacher: manual grading ----------
+
+class GradingQueueView(generics.ListAPIView):
+    """
+    GET <pk>/grading/queue/?question=<id> — finished attempts' answers waiting for manual grading
+    (long/code/short without synonyms, match/order without solution). Author/staff only.
+    Filtered by (needs_manual, question) index; ?paginate=cursor pages by id without OFFSET.
+    """
+    serializer_class = GradingQueueItemSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('id',)
+
+    def get_queryset(self):
+        test = get_object_or_404(Test.objects.select_related('lesson__course'), pk=self.kwargs['pk'])
+        if not _is_course_author_or_staff(self.request.user, test.lesson.course):
+            raise PermissionDenied("Немає прав.")
+        questions = Question.objects.filter(test=test).values('id')
+        question_id = self.request.query_params.get('question')
+        if question_id:
+            questions = questions.filter(id=question_id)
+        return (
+            AnswerAttempt.objects
+            .filter(needs_manual=True, question_id__in=questions)
+            .exclude(attempt__status=TestAttempt.Status.STARTED)
+            .select_related('question')
+            .order_by('id')
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        # plagiarism signal for long/code answers on this page (cached MinHash/LSH clusters per question)
+        similar = similar_answers_map(a.question_id for a in rows if a.question.type in SIMILARITY_TYPES)
+        ser = self.get_serializer(rows, many=True, context={**self.get_serializer_context(), 'similar_answers': similar})
+        return self.get_paginated_response(ser.data) if page is not None else Response(ser.data)
+
+
+class AnswerSimilarityView(APIView):
+    """
+    GET <pk>/grading/similarity/?question=<id> — clusters of near-duplicate long/code answers
+    per question: [{"question", "clusters": [{"answers", "attempts", "similarity"}]}]. Author/staff only.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk: int):
+        test = get_object_or_404(Test.objects.select_related('lesson__course'), pk=pk)
+        if not _is_course_author_or_staff(request.user, test.lesson.course):
+            return Response({"detail": "Немає прав."}, status=status.HTTP_403_FORBIDDEN)
+        questions = Question.objects.filter(test=test, type__in=SIMILARITY_TYPES).order_by('order', 'id')
+        question_id = request.query_params.get('question')
+        if question_id:
+            questions = questions.filter(id=question_id)
+        data = [{"question": qid, "clusters": question_clusters(qid)} for qid in questions.values_list('id', flat=True)]
+        return Response(data, status=200)
+
+
+class ManualGradeView(APIView):
+    """
+    POST <pk>/grading/
+    {"grades": [{"answer": <id>, "score": 1.5, "is_correct": true|false|null}, ...]}
+    Sets the answers' scores in bulk and recomputes the affected attempts with one UPDATE.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @transaction.atomic
+    def post(self, request, pk: int):
+        test = get_object_or_404(Test.objects.select_related('lesson__course'), pk=pk)
+        if not _is_course_author_or_staff(request.user, test.lesson.course):
+            return Response({"detail": "Немає прав."}, status=status.HTTP_403_FORBIDDEN)
+
+        ser = ManualGradeBatchSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        attempt_ids = apply_manual_grades(test, ser.validated_data['grades'])
+        transaction.on_commit(lambda: record_graded_attempts(test, attempt_ids))
+
+        attempts = TestAttempt.objects.filter(pk__in=attempt_ids).order_by('id')
+        return Response({"attempts": TestAttemptSerializer(attempts, many=True).data}, status=200)
+
+
+# ---------- Student: save answers while taking ----------
+
+MAX_ANSWERS_PER_SAVE = 200
+
+
+class SaveAnswersView(APIView):
+    """
+    PUT/POST <pk>/attempts/<attempt_id>/answers/
+    {"answers": [...]} — same item shape as submit; one answer or a small batch.
+    Upserts by (attempt, question) while the attempt is STARTED, so progress survives
+    a dropped connection and submit only has to grade what is stored. No feedback is returned.
+    """
+    permission_classes = [permissions.IsAuthenticated, HasCourseAccess]
+
+    def get_course(self, obj: Test):
+        return obj.lesson.course
+
+    @transaction.atomic
+    def post(self, request, pk: int, attempt_id: int):
+        attempt = get_object_or_404(
+            TestAttempt.objects.select_for_update(of=('self',)).select_related('test'),
+            pk=attempt_id, test_id=pk, user=request.user
+        )
+        if attempt.status != TestAttempt.Status.STARTED:
+            return Response({"detail": "Спроба вже завершена."}, status=400)
+
+        test = attempt.test
+        now = timezone.now()
+        if is_expired(test, attempt, now):
+            return Response({"detail": "Час вичерпано."}, status=400)
+
+        answers = (request.data or {}).get('answers')
+        if not isinstance(answers, list) or not answers:
+            return Response({"answers": ["Очікується непорожній список відповідей."]}, status=400)
+        if len(answers) > MAX_ANSWERS_PER_SAVE:
+            return Response({"answers": [f"Не більше {MAX_ANSWERS_PER_SAVE} відповідей за раз."]}, status=400)
+
+        graded = grade_submission(get_answer_key(test), answers)
+        upsert_graded_answers(attempt, graded)
+        return Response({"saved": [g.question_id for g in graded], "saved_at": now}, status=200)
+
+    def put(self, request, pk: int, attempt_id: int):
+        return self.post(request, pk, attempt_id)
+
+
 # ---------- Student: submit attempt ----------
 
 class SubmitAttemptView(APIView):
@@ -248,7 +406,7 @@ class SubmitAttemptView(APIView):
         user = request.user
         test = get_object_or_404(Test.objects.select_related('lesson__course'), pk=pk)
         attempt = get_object_or_404(
-            TestAttempt.objects.select_related('test__lesson__course'),
+            TestAttempt.objects.select_for_update(of=('self',)).select_related('test__lesson__course'),
             pk=attempt_id, test=test, user=user
         )
 
@@ -256,103 +414,23 @@ class SubmitAttemptView(APIView):
             return Response({"detail": "Спроба вже завершена."}, status=400)
 
         now = timezone.now()
-
-        # timer
-        if test.time_limit_sec and attempt.started_at:
-            elapsed = (now - attempt.started_at).total_seconds()
-            if elapsed > test.time_limit_sec + 1:
-                attempt.finished_at = now
-                attempt.duration_sec = int(elapsed)
-                attempt.status = TestAttempt.Status.SUBMITTED
-                attempt.score = 0
-                attempt.max_score = sum(float(q.points) for q in test.questions.all())
-                attempt.save()
-                payload = TestAttemptSerializer(attempt).data
-                payload["detail"] = "Час вичерпано. Спробу зафіксовано без балів."
-                return Response(payload, status=200)
-
-        payload = request.data or {}
-        answers: List[Dict[str, Any]] = payload.get('answers', [])
-
-        # reset (if re-submit same attempt)
-        attempt.answers.all().delete()
-
-        total_points = 0.0
-        gained_points = 0.0
-
-        # Cache questions & choices
-        qmap: Dict[int, Question] = {q.id: q for q in test.questions.all()}
-        choices_by_q: Dict[int, Dict[int, Choice]] = {qid: {c.id: c for c in q.choices.all()} for qid, q in qmap.items()}
-
-        for item in answers:
-            qid = int(item.get('question'))
-            q = qmap.get(qid)
-            if not q:
-                continue
-
-            total_points += float(q.points)
-            aa = AnswerAttempt.objects.create(attempt=attempt, question=q)
-
-            if q.type in ['single', 'true_false']:
-                selected_id = item.get('selected')
-                ch = choices_by_q[q.id].get(int(selected_id)) if selected_id else None
-                if ch:
-                    aa.selected_options.add(ch)
-                    aa.is_correct = bool(ch.is_correct)
-                    aa.score_awarded = q.points if ch.is_correct else 0
-
-            elif q.type == 'multiple':
-                selected_ids = [int(x) for x in (item.get('selected') or [])]
-                correct_ids = {cid for cid, ch in choices_by_q[q.id].items() if ch.is_correct}
-                picked_ids = {cid for cid in selected_ids if cid in choices_by_q[q.id]}
-                if picked_ids:
-                    aa.selected_options.add(*[choices_by_q[q.id][cid] for cid in picked_ids])
-
-                # partial: (good - bad) / #correct, clipped to [0..1]
-                if correct_ids:
-                    good = len(picked_ids & correct_ids)
-                    bad = len(picked_ids - correct_ids)
-                    raw = max(good - bad, 0) / len(correct_ids)
-                    aa.score_awarded = round(float(q.points) * raw, 2)
-                    aa.is_correct = (good == len(correct_ids) and bad == 0)
-
-            elif q.type in ['short', 'long', 'code']:
-                text = (item.get('text') or '').strip()
-                aa.free_text = text
-                if q.type == 'short':
-                    # allow synonyms from spec.answers (lowercased trimmed)
-                    etalons = [str(s).strip().lower() for s in (q.spec.get('answers') or [])]
-                    if etalons:
-                        aa.is_correct = (text.lower() in etalons)
-                        aa.score_awarded = q.points if aa.is_correct else 0
-                        aa.needs_manual = False
-                    else:
-                        aa.needs_manual = True
-                else:
-                    aa.needs_manual = True
-
-            elif q.type in ['match', 'order']:
-                aa.free_json = item.get('data') or {}
-                solution = q.spec.get('solution')
-                if solution is not None:
-                    aa.is_correct = (aa.free_json == solution)
-                    aa.score_awarded = q.points if aa.is_correct else 0
-                else:
-                    aa.needs_manual = True
-
-            aa.save()
-            gained_points += float(aa.score_awarded or 0)
-
-        # finalize attempt
-        attempt.max_score = total_points
-        attempt.score = gained_points
-        attempt.status = TestAttempt.Status.SUBMITTED
-        attempt.finished_at = now
-        if attempt.started_at:
-            attempt.duration_sec = int((attempt.finished_at - attempt.started_at).total_seconds())
-        attempt.save()
-
-        return Response(_respect_feedback_mode(test, attempt), status=200)
+        key = get_answer_key(test)
+
+        # timer: answers arriving after the deadline are ignored, the ones saved in time still count
+        if is_expired(test, attempt, now):
+            finalize_attempts(test, key, [attempt], now)
+            payload = TestAttemptSerializer(attempt).data
+            payload["detail"] = "Час вичерпано. Зараховано відповіді, збережені до завершення часу."
+            return Response(payload, status=200)
+
+        # answers sent with the submit itself (older FE sends everything here) are upserted first;
+        # the attempt is then graded from what is stored
+        answers: List[Dict[str, Any]] = (request.data or {}).get('answers', [])
+        if answers:
+            upsert_graded_answers(attempt, grade_submission(key, answers))
+        finalize_attempts(test, key, [attempt], now)
+
+        return Response(_respect_feedback_mode(test, attempt, key), status=200)
 class LessonTestByLessonView(APIView):
     permission_classes = [IsAuthenticated, HasCourseAccess]
 